@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import cache
+
+from core.test_runner import isolated_caches
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_caches():
+    with isolated_caches():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(test_caches):
+    # Транзакция теста откатывается вместе с версиями лент, которые подняли
+    # бы записи, поэтому страницы прошлых тестов из кеша убираются явно.
+    yield
+    cache.clear()
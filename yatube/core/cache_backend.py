@@ -0,0 +1,277 @@
+"""Общий для всех процессов кеш в файле SQLite.
+
+LocMemCache у каждого воркера свой: страницы кешируются столько раз,
+сколько воркеров, а подъём версии ленты в одном процессе не виден
+остальным. Этот бэкенд держит записи в одном файле WAL, целые числа хранит
+как INTEGER, поэтому incr — один атомарный UPDATE, а при переполнении
+вытесняет записи, к которым дольше всего не обращались.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'OFF',
+    'busy_timeout': 5000,
+}
+# SQLite хранит целые числа до 2**63; большие кладутся как pickle
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+LIVE = '(expires IS NULL OR expires > ?)'
+
+
+def _encode(value):
+    if type(value) is int and value in INTEGER_RANGE:
+        return value, 8
+    pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return pickled, len(pickled)
+
+
+def _decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле LOCATION.
+
+    OPTIONS:
+      MAX_ENTRIES, CULL_FREQUENCY — как у встроенных бэкендов: при
+        переполнении удаляется 1/CULL_FREQUENCY самых давних записей;
+      MAX_SIZE — предел суммарного размера значений в байтах;
+      CULL_EVERY — раз в сколько записей проверять пределы;
+      ACCESS_RESOLUTION — не чаще скольких секунд обновлять время
+        обращения к записи: чтение без этого было бы записью в файл.
+    """
+
+    # INSERT ... ON CONFLICT DO UPDATE появился в SQLite 3.24, а
+    # UPDATE ... RETURNING — в 3.35; со старой библиотекой (Python 3.7–3.9
+    # в CI) add и incr делают то же несколькими операторами в BEGIN
+    # IMMEDIATE.
+    upsert = sqlite3.sqlite_version_info >= (3, 24)
+    returning = sqlite3.sqlite_version_info >= (3, 35)
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.max_size = options.get('MAX_SIZE')
+        self.cull_every = options.get('CULL_EVERY', 100)
+        self.access_resolution = options.get('ACCESS_RESOLUTION', 10)
+        self._local = threading.local()
+        self._writes = count(1)
+
+    @property
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.location, isolation_level=None, check_same_thread=False
+            )
+            for name, value in PRAGMAS.items():
+                connection.execute(f'PRAGMA {name} = {value}')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _write(self, sql, params):
+        cursor = self._connection.execute(sql, params)
+        if next(self._writes) % self.cull_every == 0:
+            self._cull()
+        return cursor.rowcount
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        value, size = _encode(value)
+        now = time.time()
+        row = (key, value, self.get_backend_timeout(timeout), now, size)
+        if not self.upsert:
+            with self._transaction() as connection:
+                connection.execute(
+                    'DELETE FROM cache WHERE key = ? '
+                    'AND expires IS NOT NULL AND expires <= ?',
+                    (key, now)
+                )
+                return bool(self._write(
+                    'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?)', row
+                ))
+        return bool(self._write(
+            'INSERT INTO cache VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires, accessed = excluded.accessed, '
+            'size = excluded.size '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (*row, now)
+        ))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({placeholders}) AND {LIVE}',
+            (*keys, now)
+        ).fetchall()
+        stale = [
+            key for key, _, accessed in rows
+            if now - accessed > self.access_resolution
+        ]
+        if stale:
+            self._connection.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({", ".join("?" * len(stale))})',
+                (now, *stale)
+            )
+        return {key: _decode(value) for key, value, _ in rows}
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        value, size = _encode(value)
+        self._write(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+            (key, value, self.get_backend_timeout(timeout), time.time(), size)
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        rows = [
+            (self._key(key, version), *_encode(value))
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                [(key, value, expires, now, size) for key, value, size in rows]
+            )
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        return bool(self._connection.execute(
+            f'UPDATE cache SET expires = ?, accessed = ? '
+            f'WHERE key = ? AND {LIVE}',
+            (self.get_backend_timeout(timeout), now, key, now)
+        ).rowcount)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+            )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {LIVE}',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        update = (
+            f'UPDATE cache SET value = value + ? WHERE key = ? AND {LIVE} '
+            f"AND typeof(value) = 'integer'"
+        )
+        params = (delta, key, time.time())
+        if self.returning:
+            # Изменение и чтение одним оператором: параллельные incr не
+            # теряют приращений.
+            rows = self._connection.execute(
+                f'{update} RETURNING value', params
+            ).fetchall()
+        else:
+            with self._transaction() as connection:
+                rows = []
+                if connection.execute(update, params).rowcount:
+                    rows = connection.execute(
+                        'SELECT value FROM cache WHERE key = ?', (key,)
+                    ).fetchall()
+        if not rows:
+            raise ValueError("Key '%s' not found" % key)
+        return rows[0][0]
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут всё время потока: открывать файл на каждый
+        # запрос дороже, чем держать его открытым.
+        pass
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        entries, size = connection.execute(
+            'SELECT COUNT(*), TOTAL(size) FROM cache'
+        ).fetchone()
+        over_entries = entries > self._max_entries
+        over_size = self.max_size is not None and size > self.max_size
+        if not (over_entries or over_size):
+            return
+        # Как у встроенных бэкендов, удаляется сразу доля записей, чтобы не
+        # чистить кеш на каждой следующей записи.
+        keep = entries - max(entries // self._cull_frequency, 1)
+        if over_entries:
+            keep = min(keep, self._max_entries)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+            ')',
+            (entries - keep,)
+        )
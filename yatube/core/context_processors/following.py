@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.following import followed_group_ids, following_ids
+
+
+def following(request):
+    return {
+        'following_ids': SimpleLazyObject(
+            lambda: following_ids(request.user)
+        ),
+        'followed_group_ids': SimpleLazyObject(
+            lambda: followed_group_ids(request.user)
+        ),
+    }
@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backend import SQLiteCache
+
+# Примерно страница ленты из кеша posts.cache
+PAGE = (b'<article>' + 'Текст поста '.encode() * 40 + b'</article>') * 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержки get/set/incr у SQLiteCache, LocMemCache и '
+        'FileBasedCache'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--operations', type=int, default=5000,
+            help='Сколько операций каждого вида выполнить'
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        params = {'OPTIONS': {'MAX_ENTRIES': options['operations'] * 2}}
+        backends = {
+            'locmem': LocMemCache('bench_cache', params),
+            'filebased': FileBasedCache(f'{directory}/files', params),
+            'sqlite': SQLiteCache(f'{directory}/cache.sqlite3', params),
+        }
+        try:
+            for name, backend in backends.items():
+                self.stdout.write(name)
+                self.bench(backend, options['operations'])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def bench(self, backend, operations):
+        keys = [f'feed_page:{number}' for number in range(operations)]
+        backend.set('version', 1, None)
+        for name, operation in (
+            ('set', lambda key: backend.set(key, (PAGE, 200, []))),
+            ('get', backend.get),
+            ('get (промах)', lambda key: backend.get(key + ':missing')),
+            ('incr', lambda key: backend.incr('version')),
+        ):
+            samples = []
+            for key in keys:
+                started = time.perf_counter()
+                operation(key)
+                samples.append(time.perf_counter() - started)
+            samples.sort()
+            self.stdout.write(
+                f'  {name:<13} p50 {samples[len(samples) // 2] * 1e6:8.1f} '
+                f'p95 {samples[len(samples) * 95 // 100] * 1e6:8.1f} мкс, '
+                f'{len(samples) / sum(samples):9.0f} оп/с'
+            )
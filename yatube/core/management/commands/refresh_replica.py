@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replicas import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Обновляет файлы реплик из DATABASE_REPLICAS снимком основной базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Обновлять раз в столько секунд; 0 — обновить один раз'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.refresh()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self):
+        source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        for alias in settings.DATABASE_REPLICAS:
+            target = connections[alias].settings_dict['NAME']
+            if target == source:
+                continue
+            started = time.perf_counter()
+            snapshot(source, target)
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: снимок за {time.perf_counter() - started:.2f} с'
+            ))
@@ -0,0 +1,102 @@
+"""Гистограммы времени ответа, SQL и рендеринга шаблонов по именам видов.
+
+Счётчики живут в памяти процесса: каждый воркер отдаёт на /metrics/ свои,
+а Prometheus складывает их по меткам instance.
+"""
+import math
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = (*buckets, math.inf)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = [[0] * len(self.buckets), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def exposition(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = {
+                view: (list(counts), total)
+                for view, (counts, total) in self._series.items()
+            }
+        for view, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else f'{bound:g}'
+                lines.append(
+                    f'{self.name}_bucket{{view="{view}",le="{le}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{view="{view}"}} {total:g}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds', 'Полное время ответа.', SECONDS
+)
+SQL_SECONDS = Histogram(
+    'yatube_sql_duration_seconds', 'Время SQL-запросов за ответ.', SECONDS
+)
+SQL_QUERIES = Histogram(
+    'yatube_sql_queries', 'Число SQL-запросов за ответ.', QUERIES
+)
+TEMPLATE_SECONDS = Histogram(
+    'yatube_template_render_seconds', 'Время рендеринга шаблонов.', SECONDS
+)
+HISTOGRAMS = (REQUEST_SECONDS, SQL_SECONDS, SQL_QUERIES, TEMPLATE_SECONDS)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; собирает их middleware."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += perf_counter() - started
+            self.queries += 1
+
+    def record(self, view, seconds):
+        REQUEST_SECONDS.observe(view, seconds)
+        SQL_SECONDS.observe(view, self.sql_seconds)
+        SQL_QUERIES.observe(view, self.queries)
+        TEMPLATE_SECONDS.observe(view, self.template_seconds)
+
+
+def exposition():
+    """Все гистограммы в текстовом формате Prometheus."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.exposition()
+    return '\n'.join(lines) + '\n'
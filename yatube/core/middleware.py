@@ -0,0 +1,79 @@
+from contextlib import ExitStack
+from time import perf_counter, time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, replicas
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'replica_pin'
+
+
+class MetricsMiddleware:
+    """Меряет время ответа, SQL и шаблонов по имени вида.
+
+    Ставится первым в MIDDLEWARE, чтобы время включало и остальные
+    middleware; от DEBUG не зависит.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measured = metrics.RequestMetrics()
+        token = metrics.current.set(measured)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(measured))
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        match = request.resolver_match
+        measured.record(
+            match.view_name if match else 'unresolved',
+            perf_counter() - started
+        )
+        return response
+
+
+class ReplicaMiddleware:
+    """Решает, читает ли запрос с реплики, и закрепляет писавших.
+
+    После записи ответ ставит cookie со временем записи: пока ни одна
+    реплика не снята позже, запросы пользователя читают из основной базы и
+    видят свои правки. Дольше REPLICA_MAX_LAG cookie не живёт — реплики
+    старше этого не используются и так.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = replicas.Routing(
+            replicas.fresh_replicas(self.pinned_since(request))
+            if request.method in SAFE_METHODS else {}
+        )
+        token = replicas.current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        if routing.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, f'{time():.3f}',
+                max_age=settings.REPLICA_MAX_LAG,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+    def pinned_since(self, request):
+        value = request.COOKIES.get(PIN_COOKIE)
+        if value is None:
+            return 0
+        try:
+            return float(value)
+        except ValueError:
+            return time()
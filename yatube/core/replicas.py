@@ -0,0 +1,106 @@
+"""Чтение с реплик SQLite и запись в основную базу.
+
+Реплика — копия основного файла, которую обновляет refresh_replica; время
+изменения файла равно моменту снимка. Решение о том, откуда читать,
+принимает ReplicaMiddleware на весь запрос: небезопасные методы идут в
+основную базу, остальные читают с одной из реплик, снимок которой свежее
+последней записи пользователя, пока вид ничего не запишет.
+"""
+import os
+import random
+import sqlite3
+import time
+from contextlib import closing
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+current = ContextVar('replica_routing', default=None)
+
+# Приложения, которые всегда читают из основной базы: сессия, созданная
+# при входе, должна находиться сразу, а не после обновления реплики.
+PRIMARY_APPS = {'sessions'}
+
+
+class Routing:
+    """Откуда читает текущий запрос.
+
+    replicas — доступные реплики и время их снимков; пустой словарь
+    значит, что запрос закреплён за основной базой.
+    """
+
+    def __init__(self, replicas):
+        self.replicas = replicas
+        self.used = None
+        self.wrote = False
+
+    def read_before(self, moment):
+        """Читал ли запрос со снимка, сделанного раньше moment."""
+        return self.used is not None and self.replicas[self.used] < moment
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = current.get()
+        if (
+            routing is None or routing.wrote or not routing.replicas
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return DEFAULT_DB_ALIAS
+        if routing.used is None:
+            routing.used = random.choice(list(routing.replicas))
+        return routing.used
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def fresh_replicas(since=0):
+    """Реплики со снимками новее since и не старше REPLICA_MAX_LAG.
+
+    Реплика с тем же файлом, что и основная база (зеркало в тестах), — это
+    сама основная база, и отдельное соединение к ней не открывается.
+    """
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    oldest = max(time.time() - settings.REPLICA_MAX_LAG, since)
+    found = {}
+    for alias in settings.DATABASE_REPLICAS:
+        name = connections[alias].settings_dict['NAME']
+        if name == primary:
+            continue
+        try:
+            taken = os.stat(name).st_mtime
+        except OSError:
+            continue
+        if taken > oldest:
+            found[alias] = taken
+    return found
+
+
+def snapshot(source, target):
+    """Атомарно заменяет target копией source и возвращает время снимка.
+
+    Копия переводится в журнал DELETE: реплику только читают, а файлы
+    -wal и -shm от прежнего файла не должны достаться новому.
+    """
+    taken = time.time()
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(temporary)) as dst:
+            src.backup(dst)
+            dst.execute('PRAGMA journal_mode = DELETE')
+    os.utime(temporary, (taken, taken))
+    os.replace(temporary, target)
+    return taken
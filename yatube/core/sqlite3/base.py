@@ -0,0 +1,32 @@
+"""SQLite с настройками для нескольких воркеров.
+
+Каждое новое соединение получает PRAGMA из ключа PRAGMAS базы в DATABASES
+или, если его нет, из settings.SQLITE_PRAGMAS: WAL позволяет читателям не
+ждать писателя, а busy_timeout — ждать блокировку, а не падать сразу с
+«database is locked». Транзакции, открытые через
+core.transactions.immediate_atomic, начинаются с BEGIN IMMEDIATE.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    begin_immediate = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get(
+            'PRAGMAS', getattr(settings, 'SQLITE_PRAGMAS', {})
+        )
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Отложенная транзакция берёт блокировку на запись только на первом
+        # INSERT и, если её уже держит другой процесс, получает SQLITE_BUSY
+        # без ожидания. BEGIN IMMEDIATE ждёт блокировку сразу, в пределах
+        # busy_timeout.
+        self.cursor().execute(
+            'BEGIN IMMEDIATE' if self.begin_immediate else 'BEGIN'
+        )
@@ -0,0 +1,33 @@
+from time import perf_counter
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        measured = metrics.current.get()
+        if measured is None:
+            return super().render(context, request)
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            measured.template_seconds += perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates, которые засекают время рендеринга для метрик.
+
+    Вложенные шаблоны рендерятся движком напрямую, поэтому время
+    включённых шаблонов не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -6,3 +6,17 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page_obj, on_each_side=3):
+    """Номера страниц вокруг текущей; None обозначает пропуск."""
+    number, last = page_obj.number, page_obj.paginator.num_pages
+    left = max(number - on_each_side, 1)
+    right = min(number + on_each_side, last)
+    pages = list(range(left, right + 1))
+    if left > 1:
+        pages[:0] = [1] if left == 2 else [1, None]
+    if right < last:
+        pages += [last] if right == last - 1 else [None, last]
+    return pages
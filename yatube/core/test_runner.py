@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def isolated_caches():
+    """Переносит все кеши в файлы во временном каталоге.
+
+    Тесты и замеры bench_routes чистят кеш и кладут в него версии лент и
+    множества подписок по данным, которые потом откатываются; в общем
+    файле кеша это стёрло бы кеш запущенного сайта и оставило бы ему
+    чужие записи.
+    """
+    directory = tempfile.mkdtemp()
+    caches = {
+        alias: {**params, 'LOCATION': f'{directory}/{alias}.sqlite3'}
+        for alias, params in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = isolated_caches()
+        self._caches.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет on_commit-колбэки, зарегистрированные внутри блока.
+
+    TestCase не фиксирует свою транзакцию, и без этого подъём версий лент
+    и сброс кешей после записи в тестах не выполнялись бы никогда. То же
+    делает captureOnCommitCallbacks(execute=True) из Django 3.2.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    # Колбэк может зарегистрировать новые, поэтому выполняем до конца
+    while len(connection.run_on_commit) > start:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
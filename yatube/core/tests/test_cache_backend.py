@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..cache_backend import SQLiteCache
+
+ENTRIES: int = 10
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def backend(self, name='cache', **options):
+        return SQLiteCache(
+            f'{self.temp_dir}/{name}.sqlite3', {'OPTIONS': options}
+        )
+
+    def setUp(self):
+        self.cache = self.backend()
+        self.cache.clear()
+
+    def test_basic_operations(self):
+        """get/set/add/delete/touch ведут себя как у встроенных бэкендов"""
+        cache = self.cache
+        cache.set('post', {'text': 'Пост'})
+        self.assertEqual(cache.get('post'), {'text': 'Пост'})
+        self.assertFalse(cache.add('post', 'другое'))
+        self.assertTrue(cache.add('group', 'Группа'))
+        self.assertEqual(
+            cache.get_many(['post', 'group', 'missing']),
+            {'post': {'text': 'Пост'}, 'group': 'Группа'}
+        )
+        cache.delete_many(['post', 'group'])
+        self.assertIsNone(cache.get('post'))
+        cache.set('short', 1, 0.05)
+        self.assertTrue(cache.has_key('short'))
+        time.sleep(0.1)
+        self.assertFalse(cache.has_key('short'))
+        self.assertTrue(cache.add('short', 2))
+        self.assertTrue(cache.touch('short', None))
+        self.assertFalse(cache.touch('missing'))
+
+    def test_incr_is_shared_between_instances(self):
+        """incr атомарен и виден другому экземпляру с тем же файлом"""
+        other = self.backend()
+        self.cache.set('feed_version', 10, None)
+        self.assertEqual(self.cache.incr('feed_version'), 11)
+        self.assertEqual(other.incr('feed_version', 5), 16)
+        self.assertEqual(self.cache.get('feed_version'), 16)
+        self.assertEqual(self.cache.decr('feed_version'), 15)
+        with self.assertRaises(ValueError):
+            other.incr('missing')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        cache = self.backend(
+            'lru', MAX_ENTRIES=ENTRIES, CULL_EVERY=1, ACCESS_RESOLUTION=0
+        )
+        cache.clear()
+        cache.set('hot', 'Лента')
+        for number in range(ENTRIES * 2):
+            cache.set(f'page:{number}', number)
+            cache.get('hot')
+        self.assertEqual(cache.get('hot'), 'Лента')
+        self.assertIsNone(cache.get('page:0'))
+        self.assertLessEqual(
+            sum(cache.has_key(f'page:{n}') for n in range(ENTRIES * 2)),
+            ENTRIES
+        )
+
+    def test_max_size_limits_stored_bytes(self):
+        """MAX_SIZE ограничивает суммарный размер значений"""
+        cache = self.backend('size', MAX_SIZE=10_000, CULL_EVERY=1)
+        cache.clear()
+        for number in range(ENTRIES):
+            cache.set(f'page:{number}', b'x' * 2_000)
+        self.assertLess(
+            sum(cache.has_key(f'page:{n}') for n in range(ENTRIES)), 6
+        )
+
+
+class LegacySQLiteCacheTests(SQLiteCacheTests):
+    """Те же проверки для SQLite без UPSERT и RETURNING"""
+
+    def backend(self, name='cache', **options):
+        backend = super().backend(name, **options)
+        backend.upsert = backend.returning = False
+        return backend
@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from ..metrics import Histogram
+
+User = get_user_model()
+
+BUCKETS = (0.1, 1)
+TOKEN = 'secret'
+
+
+class MetricsTests(TestCase):
+    def test_histogram_exposition(self):
+        """Гистограмма отдаёт накопленные корзины, сумму и число"""
+        histogram = Histogram('test_seconds', 'Тест.', BUCKETS)
+        for value in (0.05, 0.5, 5):
+            histogram.observe('posts:index', value)
+        self.assertEqual(histogram.exposition()[2:], [
+            'test_seconds_bucket{view="posts:index",le="0.1"} 1',
+            'test_seconds_bucket{view="posts:index",le="1"} 2',
+            'test_seconds_bucket{view="posts:index",le="+Inf"} 3',
+            'test_seconds_sum{view="posts:index"} 5.55',
+            'test_seconds_count{view="posts:index"} 3',
+        ])
+
+    def test_requests_are_measured_by_view_name(self):
+        """Ответы попадают в /metrics/ под именем вида"""
+        self.client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        self.client.get('/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        for name in (
+            'yatube_request_duration_seconds_count{view="posts:index"}',
+            'yatube_sql_queries_count{view="posts:index"}',
+            'yatube_template_render_seconds_count{view="posts:index"}',
+        ):
+            with self.subTest(name=name):
+                self.assertContains(response, name)
+
+    @override_settings(METRICS_TOKEN=TOKEN)
+    def test_metrics_closed_for_outsiders(self):
+        """Без персонала и токена метрики закрыты, даже с INTERNAL_IPS"""
+        for headers in (
+            {'REMOTE_ADDR': '127.0.0.1'},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get('/metrics/', **headers)
+                self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN=TOKEN)
+    def test_metrics_open_by_token(self):
+        """Сборщик метрик читает их по токену из METRICS_TOKEN"""
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION=f'Bearer {TOKEN}'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
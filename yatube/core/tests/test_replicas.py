@@ -0,0 +1,141 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.cache import cache_feed
+from posts.models import Post
+from ..middleware import PIN_COOKIE, ReplicaMiddleware
+from ..replicas import (
+    ReplicaRouter, Routing, current, fresh_replicas, snapshot
+)
+
+REPLICA = 'replica'
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, routing):
+        token = current.set(routing)
+        self.addCleanup(current.reset, token)
+
+    def test_reads_leave_replica_after_write(self):
+        """После записи запрос читает только из основной базы"""
+        self.route(Routing({REPLICA: time.time()}))
+        self.assertEqual(self.router.db_for_read(Post), REPLICA)
+        self.assertEqual(self.router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_without_request_reads_go_to_primary(self):
+        """Вне запроса (команды, shell) реплики не используются"""
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_test_mirror_is_primary(self):
+        """Зеркало основной базы в тестах не считается отдельной репликой"""
+        self.assertEqual(fresh_replicas(), {})
+
+    def seen_routing(self, request):
+        seen = []
+
+        def view(request):
+            seen.append(current.get().replicas)
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return seen[0], response
+
+    def test_sessions_are_read_from_primary(self):
+        """Сессии читаются из основной базы даже при свежей реплике"""
+        self.route(Routing({REPLICA: time.time()}))
+        self.assertEqual(
+            self.router.db_for_read(Session), DEFAULT_DB_ALIAS
+        )
+
+    def test_writes_pin_user_to_primary(self):
+        """POST читает из основной базы и ставит cookie со временем записи"""
+        before = time.time()
+        replicas, response = self.seen_routing(self.factory.post('/'))
+        self.assertEqual(replicas, {})
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_MAX_LAG)
+        self.assertGreaterEqual(float(cookie.value), before - 0.001)
+        replicas, response = self.seen_routing(self.factory.get('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_stale_replica_pages_are_not_cached(self):
+        """Страницу со снимка старше правки не кладут в кеш ленты"""
+        calls = []
+
+        @cache_feed(('posts', None))
+        def view(request):
+            calls.append(request)
+            return HttpResponse('Лента')
+
+        for taken, expected_calls in ((0, 2), (time.time() + 60, 1)):
+            cache.clear()
+            calls.clear()
+            with self.subTest(taken=taken):
+                for _ in range(2):
+                    routing = Routing({REPLICA: taken})
+                    routing.used = REPLICA
+                    self.route(routing)
+                    response = view(self.factory.get('/'))
+                self.assertEqual(len(calls), expected_calls)
+                self.assertEqual(response.has_header('ETag'), taken != 0)
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_snapshot_replaces_replica_and_records_time(self):
+        """Снимок копирует базу, а время файла — момент снимка"""
+        source = os.path.join(self.temp_dir, 'primary.sqlite3')
+        target = os.path.join(self.temp_dir, 'replica.sqlite3')
+        with closing(sqlite3.connect(source)) as primary:
+            primary.execute('PRAGMA journal_mode = WAL')
+            primary.execute('CREATE TABLE post (text TEXT)')
+            primary.execute("INSERT INTO post VALUES ('Пост')")
+            primary.commit()
+            taken = snapshot(source, target)
+        with closing(sqlite3.connect(target)) as replica:
+            self.assertEqual(
+                replica.execute('SELECT text FROM post').fetchall(),
+                [('Пост',)]
+            )
+            self.assertEqual(
+                replica.execute('PRAGMA journal_mode').fetchone()[0],
+                'delete'
+            )
+        settings_dict = connections[REPLICA].settings_dict
+        original = settings_dict['NAME']
+        settings_dict['NAME'] = target
+        try:
+            self.assertAlmostEqual(
+                fresh_replicas()[REPLICA], taken, delta=1
+            )
+            self.assertEqual(fresh_replicas(since=taken + 1), {})
+            with override_settings(REPLICA_MAX_LAG=-1):
+                self.assertEqual(fresh_replicas(), {})
+        finally:
+            settings_dict['NAME'] = original
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..transactions import immediate_atomic
+
+User = get_user_model()
+
+BUSY_TIMEOUT: int = 1234
+
+
+class SqlitePragmaTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': BUSY_TIMEOUT})
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS"""
+        raw = connection.get_new_connection(
+            connection.get_connection_params()
+        )
+        try:
+            value = raw.execute('PRAGMA busy_timeout').fetchone()[0]
+        finally:
+            raw.close()
+        self.assertEqual(value, BUSY_TIMEOUT)
+
+
+class ImmediateTransactionTests(TransactionTestCase):
+    def begin(self, atomic):
+        with CaptureQueriesContext(connection) as context:
+            with atomic():
+                with atomic():
+                    User.objects.count()
+        return context.captured_queries[0]['sql']
+
+    def test_write_transactions_begin_immediate(self):
+        """immediate_atomic открывает транзакцию через BEGIN IMMEDIATE"""
+        self.assertEqual(self.begin(immediate_atomic), 'BEGIN IMMEDIATE')
+
+    def test_plain_atomic_stays_deferred(self):
+        """Обычный atomic по-прежнему начинается с BEGIN"""
+        self.assertEqual(self.begin(transaction.atomic), 'BEGIN')
+
+    def locks(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            method(url, data)
+        return any(
+            query['sql'] == 'BEGIN IMMEDIATE'
+            for query in context.captured_queries
+        )
+
+    def test_form_views_lock_only_to_save(self):
+        """Формы берут блокировку на запись только при сохранении"""
+        user = User.objects.create_user(username='writer')
+        post = Post.objects.create(text='Пост', author=user)
+        self.client.force_login(user)
+        for url in (
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[post.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertFalse(self.locks(self.client.get, url))
+        self.assertTrue(self.locks(
+            self.client.post,
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'}
+        ))
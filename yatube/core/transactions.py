@@ -0,0 +1,27 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class ImmediateAtomic(transaction.Atomic):
+    """atomic, который на SQLite сразу берёт блокировку на запись.
+
+    Действует только на внешнюю транзакцию; вложенные блоки остаются
+    точками сохранения, а другие СУБД флаг просто не читают.
+    """
+
+    def __enter__(self):
+        connection = transaction.get_connection(self.using)
+        outermost = not connection.in_atomic_block
+        if outermost:
+            connection.begin_immediate = True
+        try:
+            super().__enter__()
+        finally:
+            if outermost:
+                connection.begin_immediate = False
+
+
+def immediate_atomic(using=None, savepoint=True):
+    """Замена transaction.atomic для видов, которые пишут в базу."""
+    if callable(using):
+        return ImmediateAtomic(DEFAULT_DB_ALIAS, savepoint)(using)
+    return ImmediateAtomic(using, savepoint)
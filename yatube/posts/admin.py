@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
 
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, GroupFollow
+from .search import match_expression
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -17,6 +19,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по FTS5-индексу вместо LIKE '%...%' по всей таблице."""
+        match = match_expression(search_term)
+        if not match:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+            [match]
+        )), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = (
@@ -34,6 +48,10 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
 
 
+class GroupFollowAdmin(admin.ModelAdmin):
+    list_display = ('user', 'group')
+
+
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'description', 'slug')
     list_editable = ('description', 'slug')
@@ -45,3 +63,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(GroupFollow, GroupFollowAdmin)
@@ -0,0 +1,158 @@
+"""Замер времени ответа и числа запросов для маршрутов posts и users."""
+import math
+from time import perf_counter
+
+from django.db import connection
+from django.urls import reverse
+
+from .models import Group, Post, User, UserStats
+
+ANONYMOUS = 'anonymous'
+AUTHORIZED = 'authorized'
+PERCENTILES = (50, 95, 99)
+# Разница меньше этой не считается регрессией даже при большом проценте:
+# на быстрых страницах шум таймера сравним с самим временем ответа.
+MIN_DELTA_MS: float = 2.0
+
+
+def subjects(username=None):
+    """Пользователь, автор, пост и группа, на которых гоняются маршруты.
+
+    Без username берётся пользователь с наибольшим числом подписок, чтобы
+    лента подписок была самой тяжёлой из возможных.
+    """
+    if username is not None:
+        user = User.objects.get(username=username)
+    else:
+        stats = UserStats.objects.select_related('user').order_by(
+            '-following_count'
+        ).first()
+        user = stats.user if stats else User.objects.order_by('pk').first()
+    post = (
+        Post.objects.filter(author=user).first()
+        or Post.objects.first()
+    )
+    if user is None or post is None:
+        return None
+    author_stats = UserStats.objects.exclude(user=user).select_related(
+        'user'
+    ).order_by('-followers_count').first()
+    author = author_stats.user if author_stats else post.author
+    group = post.group or Group.objects.order_by('pk').first()
+    return user, author, post, group
+
+
+def routes(author, post, group):
+    """Адреса всех именованных маршрутов posts и users."""
+    urls = {
+        'posts:index': reverse('posts:index'),
+        'posts:profile': reverse('posts:profile', args=[author.username]),
+        'posts:post_detail': reverse('posts:post_detail', args=[post.pk]),
+        'posts:post_comments': reverse(
+            'posts:post_comments', args=[post.pk]
+        ),
+        'posts:search': reverse('posts:search') + '?q=' + (
+            post.text.split() or ['пост']
+        )[0],
+        'posts:export_data': reverse('posts:export_data', args=['posts']),
+        'posts:post_create': reverse('posts:post_create'),
+        'posts:post_edit': reverse('posts:post_edit', args=[post.pk]),
+        'posts:add_comment': reverse('posts:add_comment', args=[post.pk]),
+        'posts:follow_index': reverse('posts:follow_index'),
+        'posts:profile_follow': reverse(
+            'posts:profile_follow', args=[author.username]
+        ),
+        'posts:profile_unfollow': reverse(
+            'posts:profile_unfollow', args=[author.username]
+        ),
+        'users:signup': reverse('users:signup'),
+        'users:login': reverse('users:login'),
+        'users:logout': reverse('users:logout'),
+    }
+    if group is not None:
+        for name in ('group_list', 'group_follow', 'group_unfollow'):
+            urls[f'posts:{name}'] = reverse(
+                f'posts:{name}', args=[group.slug]
+            )
+    return urls
+
+
+def percentile(ordered, rank):
+    """Перцентиль по ближайшему рангу из отсортированной выборки."""
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def sample(call, runs, warmup=0, before=None):
+    """Вызывает call и возвращает его результат, перцентили в мс и запросы.
+
+    before вызывается перед каждым вызовом вне замера.
+    """
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    samples, counts = [], []
+    for index in range(warmup + runs):
+        if before is not None:
+            before()
+        queries = 0
+        with connection.execute_wrapper(count):
+            started = perf_counter()
+            value = call()
+            elapsed = perf_counter() - started
+        if index >= warmup:
+            samples.append(elapsed * 1000)
+            counts.append(queries)
+    samples.sort()
+    result = {'queries': max(counts)}
+    for rank in PERCENTILES:
+        result[f'p{rank}'] = round(percentile(samples, rank), 3)
+    return value, result
+
+
+def measure(client, url, runs, warmup=0, before=None):
+    """Гоняет GET на url и возвращает статус, перцентили в мс и запросы.
+
+    before вызывается перед каждым запросом вне замера, например чтобы
+    заново войти после выхода.
+    """
+    response, result = sample(
+        lambda: client.get(url), runs, warmup, before
+    )
+    return {'status': response.status_code, **result}
+
+
+def regressions(baseline, results, threshold):
+    """Строки с описанием регрессий results относительно baseline.
+
+    Число запросов не должно расти вовсе, а p50 и p95 — больше чем на
+    threshold от базового значения и больше чем на MIN_DELTA_MS.
+    """
+    found = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            continue
+        if current['status'] != base['status']:
+            found.append(
+                f'{key}: статус {base["status"]} → {current["status"]}'
+            )
+        if current['queries'] > base['queries']:
+            found.append(
+                f'{key}: запросов {base["queries"]} → {current["queries"]}'
+            )
+        for rank in PERCENTILES[:2]:
+            name = f'p{rank}'
+            limit = max(
+                base[name] * (1 + threshold), base[name] + MIN_DELTA_MS
+            )
+            if current[name] > limit:
+                found.append(
+                    f'{key}: {name} {base[name]:.1f} → '
+                    f'{current[name]:.1f} мс'
+                )
+    return found
@@ -0,0 +1,219 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from core import replicas
+from core.middleware import PIN_COOKIE
+
+VARY_COOKIES = (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME)
+
+
+def version_key(scope, ident=''):
+    return f'feed_version:{scope}:{ident}'
+
+
+def modified_key(key):
+    return f'feed_modified:{key}'
+
+
+def get_versions(keys):
+    """Текущие версии лент и время последнего изменения любой из них.
+
+    Недостающие версии заводятся заново. Начальное значение берётся от
+    часов, чтобы версия, вытесненная из кеша, не совпала с прежней и не
+    воскресила устаревшие страницы.
+    """
+    stamps = [modified_key(key) for key in keys]
+    found = cache.get_many(keys + stamps)
+    initial = dict.fromkeys(keys, time.time_ns() // 1000)
+    initial.update(dict.fromkeys(stamps, int(time.time())))
+    for key, value in initial.items():
+        if key not in found:
+            cache.add(key, value, None)
+            found[key] = cache.get(key)
+    return (
+        [found[key] for key in keys],
+        max(found[stamp] for stamp in stamps),
+    )
+
+
+def bump(scope, ident=''):
+    key = version_key(scope, ident)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, None)
+    cache.set(modified_key(key), int(time.time()), None)
+
+
+def bump_posts(posts):
+    """Поднимает версии страниц, на которых видны посты пачки.
+
+    Посты нужны с author и group: берутся их username и slug.
+    """
+    bump('posts')
+    for username in {post.author.username for post in posts}:
+        bump('author', username)
+    for slug in {post.group.slug for post in posts if post.group}:
+        bump('group', slug)
+    for post in posts:
+        bump('post', post.pk)
+
+
+def _slot_key(request, view_name):
+    vary = [request.COOKIES.get(name, '') for name in VARY_COOKIES]
+    raw = '|'.join([view_name, request.get_full_path(), *vary])
+    return 'feed_page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _etag(slot, versions):
+    raw = '|'.join([slot, *map(str, versions)])
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def _cacheable(request, response, last_modified):
+    routing = replicas.current.get()
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not (
+            request.META.get('CSRF_COOKIE_USED')
+            and settings.CSRF_COOKIE_NAME not in request.COOKIES
+        )
+        # Снимок реплики старше последнего подъёма версии: страница может
+        # не содержать правок, под версию которых её пришлось бы сохранить.
+        and not (
+            routing is not None and routing.read_before(last_modified + 1)
+        )
+    )
+
+
+def _validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _response(entry):
+    content, status, headers = entry[2:]
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+def _while_rendering(request, slot, versions, entry):
+    """Ответ, пока страницу перерисовывает запрос, взявший блокировку.
+
+    Прежняя копия отдаётся без валидаторов, чтобы браузер не закрепил её под
+    ETag новых версий. None — дождаться не вышло, рисовать самому.
+    """
+    # Только что писавший должен увидеть свою правку
+    if entry is None or PIN_COOKIE in request.COOKIES:
+        entry = _wait_for(slot, versions)
+    if entry is None:
+        return None
+    response = _response(entry)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _wait_for(slot, versions):
+    """Ждёт, пока страницу отрисует запрос, взявший блокировку."""
+    deadline = time.monotonic() + settings.FEED_RENDER_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.FEED_RENDER_POLL_INTERVAL)
+        entry = cache.get(slot)
+        if entry is not None and entry[0] == versions:
+            return entry
+        if cache.get(f'{slot}:lock') is None:
+            break
+    return None
+
+
+def _ident(arg, kwargs):
+    if arg is None:
+        return ''
+    if callable(arg):
+        return arg(**kwargs)
+    return kwargs[arg]
+
+
+def cache_feed(*scopes, timeout=None):
+    """Кеширует страницу ленты до смены версии любой из её областей.
+
+    scopes — пары (область, имя аргумента вида со значением области,
+    функция, которая получает аргументы вида и возвращает значение, или
+    None). Версии поднимают сигналы в posts.signals, поэтому страницы можно
+    держать часами: любая правка сразу делает страницу устаревшей. ETag
+    строится по версиям, а время последнего подъёма версии служит
+    Last-Modified, так что повторный запрос без изменений получает 304 без
+    запросов к базе.
+
+    Страница одного адреса лежит в одной записи вместе с версиями, для
+    которых она отрисована. Устаревшую (по версиям или по timeout) заново
+    рисует только запрос, взявший блокировку; остальные тем временем
+    получают прежнюю копию, а если её нет или пользователь только что
+    писал, — ждут готовую страницу.
+    """
+    timeout = settings.FEED_CACHE_TIMEOUT if timeout is None else timeout
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            keys = [
+                version_key(scope, _ident(arg, kwargs))
+                for scope, arg in scopes
+            ]
+            # Кнопки подписки на странице зависят от подписок зрителя
+            viewer = getattr(request, 'session', {}).get(SESSION_KEY)
+            if viewer is not None:
+                keys.append(version_key('following', viewer))
+            versions, last_modified = get_versions(keys)
+            slot = _slot_key(request, view.__name__)
+            etag = _etag(slot, versions)
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if not_modified is not None:
+                return _validators(not_modified, etag, last_modified)
+            entry = cache.get(slot)
+            fresh = (
+                entry is not None and entry[0] == versions
+                and entry[1] > time.time()
+            )
+            if fresh:
+                return _validators(_response(entry), etag, last_modified)
+            lock = f'{slot}:lock'
+            if not cache.add(lock, True, settings.FEED_RENDER_LOCK_TIMEOUT):
+                return (
+                    _while_rendering(request, slot, versions, entry)
+                    or view(request, *args, **kwargs)
+                )
+            try:
+                response = view(request, *args, **kwargs)
+                if _cacheable(request, response, last_modified):
+                    cache.set(slot, (
+                        versions,
+                        time.time() + timeout,
+                        response.content,
+                        response.status_code,
+                        list(response.items()),
+                    ), timeout + settings.FEED_STALE_TIMEOUT)
+                    _validators(response, etag, last_modified)
+            finally:
+                cache.delete(lock)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, GroupFollow, Post, User, UserStats
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'following_count': (Follow, 'user'),
+    'followers_count': (Follow, 'author'),
+    'group_following_count': (GroupFollow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+# Счётчики, сумма которых хранится в subscriptions_count
+SUBSCRIPTIONS = ('following_count', 'group_following_count')
+# Все хранимые поля UserStats
+FIELDS = (*COUNTERS, 'subscriptions_count')
+
+
+def _count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('*')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def counted_users(queryset=None):
+    """Пользователи с посчитанными заново значениями всех счётчиков."""
+    queryset = User.objects.all() if queryset is None else queryset
+    return queryset.annotate(**{
+        name: _count_subquery(model, field)
+        for name, (model, field) in COUNTERS.items()
+    }).annotate(
+        subscriptions_count=F('following_count') + F('group_following_count')
+    )
+
+
+def recount(user_id):
+    user = counted_users().values(*FIELDS).get(pk=user_id)
+    UserStats.objects.update_or_create(user_id=user_id, defaults=user)
+
+
+def shift(user_id, **deltas):
+    """Сдвигает счётчики пользователя одним UPDATE.
+
+    Если строки ещё нет, при увеличении она пересчитывается целиком, а при
+    уменьшении ничего не делается: чинить её будет recount_user_stats.
+    """
+    subscriptions = sum(deltas.get(name, 0) for name in SUBSCRIPTIONS)
+    if subscriptions:
+        deltas['subscriptions_count'] = subscriptions
+    updated = UserStats.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    })
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        with transaction.atomic():
+            recount(user_id)
@@ -0,0 +1,63 @@
+import json
+from contextlib import contextmanager
+
+from django.utils import timezone
+
+CHUNK_SIZE: int = 1 << 16
+SEPARATORS = frozenset(' \t\r\n,[]')
+
+
+def iter_json_objects(stream, chunk_size=CHUNK_SIZE):
+    """Объекты из JSON-массива или NDJSON, прочитанные кусками.
+
+    В памяти держится только текущий кусок файла и разбираемый объект,
+    поэтому размер дампа не важен.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer, position = stream.read(chunk_size), 0
+            eof = not buffer
+            continue
+        try:
+            obj, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield obj
+
+
+@contextmanager
+def raw_dates(model, objects=()):
+    """Отключает auto_now и auto_now_add у полей модели.
+
+    Иначе bulk_create запишет вместо дат из дампа текущее время; пустые
+    даты у objects заполняются текущим временем, как при обычном save().
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    now = timezone.now()
+    for obj in objects:
+        for field in fields:
+            if getattr(obj, field.attname) is None:
+                setattr(obj, field.attname, now)
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -0,0 +1,130 @@
+import csv
+import datetime as dt
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE: int = 2000
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Для каждой выгрузки: модель, колонки и поля, по которым работают
+# фильтры автора, группы и дат; None — фильтр к выгрузке не применим.
+EXPORTS = {
+    'posts': (Post, (
+        'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+    ), {
+        'author': 'author__username',
+        'group': 'group__slug',
+        'date': 'pub_date',
+    }),
+    'comments': (Comment, (
+        'id', 'post_id', 'author__username', 'text', 'created',
+    ), {
+        'author': 'author__username',
+        'group': 'post__group__slug',
+        'date': 'created',
+    }),
+    'follows': (Follow, (
+        'id', 'user__username', 'author__username',
+    ), {
+        'author': 'author__username',
+        'group': None,
+        'date': None,
+    }),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _day_start(value, name):
+    try:
+        day = parse_date(value) if isinstance(value, str) else value
+    except ValueError:
+        # Формат верный, но такого дня нет: 2024-02-30
+        day = None
+    if day is None:
+        raise ExportError(f'{name}: ожидается дата вида ГГГГ-ММ-ДД')
+    return timezone.make_aware(dt.datetime.combine(day, dt.time.min))
+
+
+def _filters(kind, author, group, since, until, after):
+    lookups = EXPORTS[kind][2]
+    wanted = (
+        ('author', '', author),
+        ('group', '', group),
+        ('date', '__gte', since and _day_start(since, 'since')),
+        ('date', '__lt', until and (
+            _day_start(until, 'until') + dt.timedelta(days=1)
+        )),
+    )
+    filters = {}
+    for name, suffix, value in wanted:
+        if not value:
+            continue
+        if lookups[name] is None:
+            raise ExportError(f'{kind}: отбор по полю {name} не поддержан')
+        filters[lookups[name] + suffix] = value
+    if after:
+        try:
+            filters['pk__gt'] = int(after)
+        except ValueError:
+            raise ExportError('after: ожидается id записи')
+    return filters
+
+
+def export_rows(kind, author=None, group=None, since=None, until=None,
+                after=None, limit=None, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки по порядку id, без загрузки всей выборки в память.
+
+    since и until включают границы; after продолжает выгрузку после
+    указанного id, а limit её ограничивает. Ошибки в параметрах
+    выбрасываются сразу, до начала выгрузки.
+    """
+    if kind not in EXPORTS:
+        raise ExportError(f'Неизвестная выгрузка: {kind}')
+    model, columns, _ = EXPORTS[kind]
+    queryset = model.objects.filter(
+        **_filters(kind, author, group, since, until, after)
+    ).order_by('pk').values_list(*columns)
+    if limit:
+        queryset = queryset[:limit]
+    return (
+        dict(zip(columns, row))
+        for row in queryset.iterator(chunk_size=chunk_size)
+    )
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def as_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def as_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def render_lines(kind, rows, fmt):
+    """Строки выгрузки в выбранном формате, по одной записи за раз."""
+    if fmt == 'csv':
+        return as_csv(rows, EXPORTS[kind][1])
+    if fmt == 'ndjson':
+        return as_ndjson(rows)
+    raise ExportError(f'Неизвестный формат: {fmt}')
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FeedItem, Follow, GroupFollow, Post, UserStats
+
+BATCH_SIZE: int = 1000
+
+
+def _chunks(values, size=BATCH_SIZE):
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def subscribed_posts(user_id):
+    """Посты авторов и групп, на которые подписан пользователь.
+
+    Подписки входят подзапросами, поэтому пост автора из группы, на которую
+    читатель тоже подписан, попадает в выборку один раз.
+    """
+    return Post.objects.filter(
+        Q(author_id__in=Follow.objects.filter(
+            user_id=user_id
+        ).values('author_id'))
+        | Q(group_id__in=GroupFollow.objects.filter(
+            user_id=user_id
+        ).values('group_id'))
+    )
+
+
+def heavy_readers():
+    """id читателей, чья лента собирается при чтении (posts.streams).
+
+    Таким читателям посты не раскладываются: у них слишком много подписок
+    на авторов и группы, чтобы писать строку в их ленту на каждый пост.
+    """
+    return UserStats.objects.filter(
+        subscriptions_count__gte=settings.PULL_FEED_MIN_FOLLOWING
+    ).values('user_id')
+
+
+def pulls(user_id):
+    return heavy_readers().filter(user_id=user_id).exists()
+
+
+def trim_feed(user_id):
+    """Оставляет в ленте пользователя не больше FOLLOW_FEED_DEPTH записей."""
+    stale = FeedItem.objects.filter(user_id=user_id).values_list(
+        'pk', flat=True
+    )[settings.FOLLOW_FEED_DEPTH:]
+    FeedItem.objects.filter(pk__in=list(stale)).delete()
+
+
+def fan_out_post(post):
+    """Раскладывает пост по лентам подписчиков автора и его группы.
+
+    UNION убирает повторы: подписчик и автора, и группы получает пост один
+    раз.
+    """
+    readers = Follow.objects.filter(author_id=post.author_id).exclude(
+        user_id__in=heavy_readers()
+    ).values_list('user_id', flat=True)
+    if post.group_id is not None:
+        readers = readers.union(GroupFollow.objects.filter(
+            group_id=post.group_id
+        ).exclude(
+            user_id__in=heavy_readers()
+        ).values_list('user_id', flat=True))
+    trim = post.pk % settings.FOLLOW_FEED_TRIM_EVERY == 0
+    for user_ids in _chunks(readers.iterator()):
+        FeedItem.objects.bulk_create(
+            [
+                FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True
+        )
+        if trim:
+            for user_id in user_ids:
+                trim_feed(user_id)
+
+
+def regroup_post(post):
+    """Раскладывает пост заново после переноса в другую группу.
+
+    Из лент подписчиков прежней группы пост уходит, если они не подписаны
+    на автора.
+    """
+    FeedItem.objects.filter(post=post).exclude(
+        user_id__in=Follow.objects.filter(
+            author_id=post.author_id
+        ).values('user_id')
+    ).delete()
+    fan_out_post(post)
+
+
+def _backfill(user_id, posts):
+    # Если с этой подпиской читатель перешёл на сборку ленты при чтении,
+    # материализованная лента ему больше не нужна.
+    if pulls(user_id):
+        FeedItem.objects.filter(user_id=user_id).delete()
+        return
+    recent = posts.values_list('pk', 'pub_date')[:settings.FOLLOW_FEED_DEPTH]
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in recent
+        ],
+        ignore_conflicts=True
+    )
+    trim_feed(user_id)
+
+
+def backfill_follow(follow):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    _backfill(follow.user_id, Post.objects.filter(author_id=follow.author_id))
+
+
+def backfill_group_follow(group_follow):
+    """Добавляет в ленту подписчика последние посты группы."""
+    _backfill(
+        group_follow.user_id,
+        Post.objects.filter(group_id=group_follow.group_id)
+    )
+
+
+def _prune(user_id, posts):
+    # Читателю, который с этой отпиской вернулся к материализованной
+    # ленте, она собирается заново.
+    subscriptions = UserStats.objects.filter(
+        user_id=user_id
+    ).values_list('subscriptions_count', flat=True).first()
+    if subscriptions is not None:
+        if subscriptions >= settings.PULL_FEED_MIN_FOLLOWING:
+            return
+        if subscriptions == settings.PULL_FEED_MIN_FOLLOWING - 1:
+            rebuild_feed(user_id)
+            return
+    FeedItem.objects.filter(user_id=user_id, post__in=posts).delete()
+
+
+def prune_follow(follow):
+    """Убирает из ленты посты автора, от которого читатель отписался.
+
+    Посты из групп, на которые читатель подписан, остаются.
+    """
+    _prune(follow.user_id, Post.objects.filter(
+        author_id=follow.author_id
+    ).exclude(group_id__in=GroupFollow.objects.filter(
+        user_id=follow.user_id
+    ).values('group_id')))
+
+
+def prune_group_follow(group_follow):
+    """Убирает из ленты посты группы, кроме постов авторов из подписок."""
+    _prune(group_follow.user_id, Post.objects.filter(
+        group_id=group_follow.group_id
+    ).exclude(author_id__in=Follow.objects.filter(
+        user_id=group_follow.user_id
+    ).values('author_id')))
+
+
+def rebuild_feed(user_id):
+    """Полностью пересобирает ленту пользователя по его подпискам."""
+    FeedItem.objects.filter(user_id=user_id).delete()
+    if pulls(user_id):
+        return
+    recent = subscribed_posts(user_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.FOLLOW_FEED_DEPTH]
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in recent
+        ]
+    )
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+
+from .models import Follow, GroupFollow
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def followed_groups_key(user_id):
+    return f'following_groups:{user_id}'
+
+
+def _cached_ids(key, queryset):
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(queryset)
+        cache.set(key, ids, None)
+    return ids
+
+
+def following_ids(user):
+    """id авторов, на которых подписан пользователь.
+
+    Множество читается из базы один раз и дальше живёт в кеше, пока
+    подписка или отписка не сбросит его (см. posts.signals), так что
+    состояние кнопок для целой страницы авторов проверяется без запросов.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    return _cached_ids(
+        following_key(user.pk),
+        Follow.objects.filter(user_id=user.pk).values_list(
+            'author_id', flat=True
+        )
+    )
+
+
+def followed_group_ids(user):
+    """id групп, на которые подписан пользователь; кешируется так же."""
+    if not user.is_authenticated:
+        return frozenset()
+    return _cached_ids(
+        followed_groups_key(user.pk),
+        GroupFollow.objects.filter(user_id=user.pk).values_list(
+            'group_id', flat=True
+        )
+    )
+
+
+def forget_following(user_id):
+    """Сбрасывает закешированные подписки пользователя на авторов.
+
+    Множество не правится на месте: чтение и запись кеша из двух запросов
+    могли бы разойтись, а следующее чтение соберёт его из базы.
+    """
+    cache.delete(following_key(user_id))
+
+
+def forget_followed_groups(user_id):
+    cache.delete(followed_groups_key(user_id))
@@ -0,0 +1,118 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import cache
+from posts.models import Post
+from posts.thumbnails import _init_worker, render_thumbnails, store_entries
+
+
+def _render(name):
+    try:
+        return name, render_thumbnails(name), None
+    except Exception as error:
+        return name, None, repr(error)
+
+
+class Command(BaseCommand):
+    help = 'Заново готовит миниатюры всех картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обрабатывать за один проход'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Сколько процессов готовят миниатюры; 0 — в этом процессе'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, 'thumbnail_backfill.json'),
+            help='Файл, в котором хранится место остановки'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на сохранённое место остановки'
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        state = {'last_pk': 0, 'done': 0, 'failed': 0}
+        if not options['restart'] and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                state.update(json.load(file))
+            self.stdout.write(f'Продолжаем после поста {state["last_pk"]}')
+        pool = None
+        if options['workers']:
+            pool = multiprocessing.get_context('spawn').Pool(
+                options['workers'], initializer=_init_worker
+            )
+        posts = Post.objects.exclude(image='').select_related(
+            'author', 'group'
+        ).only('image', 'author__username', 'group__slug').order_by('pk')
+        started, done = time.monotonic(), 0
+        try:
+            while True:
+                batch = list(posts.filter(pk__gt=state['last_pk'])[
+                    :options['batch_size']
+                ])
+                if not batch:
+                    break
+                names = list(dict.fromkeys(post.image.name for post in batch))
+                results = (
+                    pool.imap_unordered(_render, names) if pool
+                    else map(_render, names)
+                )
+                done += self.store(results, state)
+                # Закешированные страницы и карточки постов пачки показывают
+                # новые миниатюры только после смены версий и updated
+                Post.objects.filter(
+                    pk__in=[post.pk for post in batch]
+                ).update(updated=timezone.now())
+                cache.bump_posts(batch)
+                state['last_pk'] = batch[-1].pk
+                self.save_checkpoint(checkpoint, state)
+                self.stdout.write(
+                    f'Пост {state["last_pk"]}: '
+                    f'{done / (time.monotonic() - started):.1f} картинок/с'
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово картинок: {state["done"]}, '
+            f'с ошибками: {state["failed"]}; '
+            f'за этот запуск {done} за {elapsed:.1f} с '
+            f'({done / elapsed if elapsed else 0:.1f} картинок/с)'
+        ))
+
+    def store(self, results, state):
+        entries, thumbnail_lists, done = {}, {}, 0
+        for name, result, error in results:
+            if error is not None:
+                state['failed'] += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            image_entries, list_key, thumbnail_keys = result
+            entries.update(image_entries)
+            thumbnail_lists.setdefault(list_key, []).extend(thumbnail_keys)
+            done += 1
+        store_entries(entries, thumbnail_lists)
+        state['done'] += done
+        return done
+
+    def save_checkpoint(self, checkpoint, state):
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(state, file)
+        os.replace(temporary, checkpoint)
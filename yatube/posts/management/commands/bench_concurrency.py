@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Модуль подгружается в дочерних процессах до настройки Django, поэтому
+# модели и всё, что их тянет, импортируются только внутри функций.
+
+# Адрес не из INTERNAL_IPS, чтобы debug_toolbar не встраивался в ответы
+REMOTE_ADDR = '192.0.2.1'
+ENGINES = {
+    'stock': 'django.db.backends.sqlite3',
+    'tuned': 'core.sqlite3',
+}
+
+
+def _read(post_id):
+    from posts.models import Comment, Post
+
+    comments = Comment.objects.filter(post_id=post_id)
+    list(Post.objects.select_related('author', 'group')[:10])
+    list(comments.select_related('author')[:10])
+
+
+def _worker(name, mode, role, seconds, post_id, username, barrier, results):
+    # Процесс запускается через spawn, поэтому базу и движок можно
+    # подменить до настройки Django.
+    settings.DATABASES['default'].update(NAME=name, ENGINE=ENGINES[mode])
+    django.setup()
+    from django.db import OperationalError
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.models import User
+
+    client = Client(REMOTE_ADDR=REMOTE_ADDR)
+    if role == 'write':
+        client.force_login(User.objects.get(username=username))
+        url = reverse('posts:add_comment', args=[post_id])
+    samples, errors = [], 0
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'write':
+                client.post(url, {'text': 'Нагрузочный комментарий'})
+            else:
+                _read(post_id)
+        except OperationalError:
+            errors += 1
+            continue
+        samples.append((time.perf_counter() - started) * 1000)
+    results.put((role, samples, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтения и записи при нескольких '
+        'процессах на копии базы: стандартный SQLite против core.sqlite3'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Сколько процессов читают ленту'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=4,
+            help='Сколько процессов пишут комментарии через add_comment'
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Сколько секунд длится каждый прогон'
+        )
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if 'sqlite3' not in database['ENGINE']:
+            raise CommandError('Замер имеет смысл только для SQLite')
+        from posts.models import Post
+
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('База пуста: сначала запустите seed_scale')
+        directory = tempfile.mkdtemp()
+        try:
+            summaries = {}
+            for mode, engine in ENGINES.items():
+                name = os.path.join(directory, f'{mode}.sqlite3')
+                self.copy(database['NAME'], name, mode)
+                self.stdout.write(f'{mode}: {engine}')
+                summaries[mode] = self.run(name, mode, post, options)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        for role in ('read', 'write'):
+            stock = summaries['stock'][role]
+            if stock:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{role}: ×{summaries["tuned"][role] / stock:.2f} '
+                    f'к пропускной способности'
+                ))
+
+    def copy(self, source, name, mode):
+        with sqlite3.connect(source) as src, sqlite3.connect(name) as dst:
+            src.backup(dst)
+            if mode == 'stock':
+                dst.execute('PRAGMA journal_mode = DELETE')
+        dst.close()
+        src.close()
+
+    def run(self, name, mode, post, options):
+        from posts.benchmark import percentile
+
+        context = multiprocessing.get_context('spawn')
+        roles = ['read'] * options['readers'] + ['write'] * options['writers']
+        barrier = context.Barrier(len(roles))
+        results = context.Queue()
+        processes = [
+            context.Process(target=_worker, args=(
+                name, mode, role, options['seconds'], post.pk,
+                post.author.username, barrier, results
+            ))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        summary = {}
+        for role in ('read', 'write'):
+            samples = sorted(
+                sample
+                for kind, role_samples, _ in collected if kind == role
+                for sample in role_samples
+            )
+            errors = sum(
+                count for kind, _, count in collected if kind == role
+            )
+            summary[role] = len(samples) / options['seconds']
+            self.stdout.write(
+                f'  {role:<5} {summary[role]:9.1f} оп/с, '
+                f'p95 {percentile(samples, 95) if samples else 0:8.2f} мс, '
+                f'ошибок «database is locked»: {errors}'
+            )
+        return summary
@@ -0,0 +1,165 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import override_settings
+
+from posts.benchmark import sample, subjects
+from posts.counters import recount
+from posts.feed import rebuild_feed, subscribed_posts
+from posts.following import followed_groups_key, following_key
+from posts.models import FeedItem, Follow, Group, GroupFollow, UserStats
+from posts.streams import MergedFeedPaginator, stream_key, subscriptions
+from posts.utils import FEED_KEYSET, NUMBER_OF_POST, CursorPaginator
+
+
+def join_page(user, cursor):
+    return CursorPaginator(
+        subscribed_posts(user.pk).select_related('author', 'group'),
+        NUMBER_OF_POST
+    ).get_page(cursor)
+
+
+def fan_out_page(user, cursor):
+    page = CursorPaginator(
+        FeedItem.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ),
+        NUMBER_OF_POST,
+        key=FEED_KEYSET
+    ).get_page(cursor)
+    page.object_list = [item.post for item in page]
+    return page
+
+
+def pull_page(user, cursor):
+    return MergedFeedPaginator(
+        subscriptions(user), NUMBER_OF_POST
+    ).get_page(cursor)
+
+
+ENGINES = {
+    'join': join_page,
+    'fan-out': fan_out_page,
+    'pull': pull_page,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленту подписок тяжёлого читателя: прямой запрос по '
+        'подпискам, материализованную ленту и слияние потоков авторов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=30,
+            help='Сколько замеров делать для каждой страницы'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько вызовов сделать до замеров'
+        )
+        parser.add_argument(
+            '--username',
+            help='Читатель; по умолчанию тот, у кого больше всего подписок'
+        )
+        parser.add_argument(
+            '--follow', type=int, default=500,
+            help='На время замера подписать читателя на столько самых '
+                 'пишущих авторов'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=10,
+            help='И на столько самых больших групп'
+        )
+        parser.add_argument(
+            '--page', type=int, default=10,
+            help='Номер глубокой страницы, которая замеряется вместе с первой'
+        )
+
+    def handle(self, *args, **options):
+        found = subjects(options['username'])
+        if found is None:
+            raise CommandError('База пуста: сначала запустите seed_scale')
+        user = found[0]
+        # Подписки и лента, собранные для замера, откатываются вместе с
+        # транзакцией; множества подписок читателя в кеше сбрасываются.
+        try:
+            with transaction.atomic():
+                self.follow(user, options['follow'], options['groups'])
+                self.run(user, options)
+                transaction.set_rollback(True)
+        finally:
+            cache.delete_many(
+                [following_key(user.pk), followed_groups_key(user.pk)]
+            )
+
+    def follow(self, user, count, group_count):
+        authors = UserStats.objects.exclude(user=user).order_by(
+            '-posts_count'
+        ).values_list('user_id', flat=True)[:count]
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author) for author in authors],
+            ignore_conflicts=True
+        )
+        groups = Group.objects.annotate(size=Count('posts')).order_by(
+            '-size'
+        ).values_list('pk', flat=True)[:group_count]
+        GroupFollow.objects.bulk_create(
+            [GroupFollow(user=user, group_id=group) for group in groups],
+            ignore_conflicts=True
+        )
+        recount(user.pk)
+        cache.delete_many(
+            [following_key(user.pk), followed_groups_key(user.pk)]
+        )
+        following = Follow.objects.filter(user=user).count()
+        groups = user.group_follows.count()
+        # Материализованная лента нужна для сравнения, даже если читатель
+        # уже за порогом сборки при чтении.
+        with override_settings(
+            PULL_FEED_MIN_FOLLOWING=following + groups + 1
+        ):
+            rebuild_feed(user.pk)
+        self.stdout.write(
+            f'{user.username}: подписок на авторов {following}, '
+            f'на группы {groups}'
+        )
+
+    def cursors(self, user, number):
+        """Курсоры первой и самой глубокой достижимой страницы до number."""
+        reached, cursor = 1, None
+        page = join_page(user, None)
+        while reached < number and page.paginator.next_cursor:
+            reached, cursor = reached + 1, page.paginator.next_cursor
+            page = join_page(user, cursor)
+        return {1: None, reached: cursor}
+
+    def run(self, user, options):
+        # Холодная сборка при чтении: сбрасываются только потоки авторов и
+        # групп читателя, а не весь общий с сайтом кеш.
+        streams = [stream_key(*source) for source in subscriptions(user)]
+        modes = [(name, None) for name in ENGINES]
+        modes.append(('pull', partial(cache.delete_many, streams)))
+        for number, cursor in self.cursors(user, options['page']).items():
+            pages = {}
+            for name, before in modes:
+                page, result = sample(
+                    lambda: ENGINES[name](user, cursor),
+                    options['runs'], options['warmup'], before
+                )
+                pages[name] = [post.pk for post in page]
+                label = name if before is None else f'{name} (холодный)'
+                self.stdout.write(
+                    f'стр. {number:<3} {label:<18} '
+                    f'p50 {result["p50"]:8.2f} p95 {result["p95"]:8.2f} '
+                    f'p99 {result["p99"]:8.2f} мс, '
+                    f'запросов {result["queries"]}'
+                )
+            if len({tuple(pks) for pks in pages.values()}) > 1:
+                raise CommandError(
+                    f'Страница {number} различается между движками'
+                )
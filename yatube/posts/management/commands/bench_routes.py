@@ -0,0 +1,131 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from core.test_runner import isolated_caches
+from posts.benchmark import (
+    ANONYMOUS, AUTHORIZED, measure, regressions, routes, subjects
+)
+
+# Адрес не из INTERNAL_IPS, чтобы debug_toolbar не встраивался в ответы
+REMOTE_ADDR = '192.0.2.1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99 и число запросов для всех маршрутов posts и '
+        'users на текущей базе и сравнивает их с сохранённой базовой линией'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=50,
+            help='Сколько замеров делать для каждого маршрута'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Сколько запросов сделать до замеров'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'route_benchmark.json'),
+            help='JSON-файл с базовой линией'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Допустимый рост p50 и p95 в долях от базовой линии'
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Записать результаты как новую базовую линию'
+        )
+        parser.add_argument(
+            '--username',
+            help='Пользователь для авторизованных замеров; по умолчанию '
+                 'тот, у кого больше всего подписок'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+
+    def handle(self, *args, **options):
+        found = subjects(options['username'])
+        if found is None:
+            raise CommandError('База пуста: сначала запустите seed_scale')
+        user, author, post, group = found
+        urls = routes(author, post, group)
+        # Запросы на подписку, выход и прочие записи откатываются вместе
+        # с транзакцией, так что база после замеров остаётся прежней.
+        # Кеш на время замеров временный: страницы и множества подписок,
+        # собранные по откатываемым данным, и очистка кеша в --cold не
+        # затрагивают кеш работающего сайта.
+        with isolated_caches(), transaction.atomic():
+            results = self.run(urls, user, options)
+            transaction.set_rollback(True)
+        baseline_path = options['baseline']
+        if options['update'] or not os.path.exists(baseline_path):
+            self.save(baseline_path, results, options)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {baseline_path}'
+            ))
+            return
+        with open(baseline_path) as file:
+            saved = json.load(file)
+        if saved['cold'] != options['cold']:
+            raise CommandError(
+                'Базовая линия снята в другом режиме кеша (--cold); '
+                'перезапишите её с --update'
+            )
+        baseline = saved['routes']
+        found = regressions(baseline, results, options['threshold'])
+        for key in sorted(set(results) - set(baseline)):
+            self.stdout.write(f'{key}: нет в базовой линии')
+        if found:
+            raise CommandError(
+                'Регрессии относительно базовой линии:\n' + '\n'.join(found)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run(self, urls, user, options):
+        results = {}
+        for role in (ANONYMOUS, AUTHORIZED):
+            client = Client(REMOTE_ADDR=REMOTE_ADDR)
+            before = None
+            if role == AUTHORIZED:
+                client.force_login(user)
+
+                def before(client=client):
+                    if options['cold']:
+                        cache.clear()
+                    if '_auth_user_id' not in client.session:
+                        client.force_login(user)
+            elif options['cold']:
+                before = cache.clear
+            for name, url in urls.items():
+                key = f'{role}:{name}'
+                results[key] = result = measure(
+                    client, url, options['runs'], options['warmup'], before
+                )
+                self.stdout.write(
+                    f'{key:<36} {result["status"]} '
+                    f'p50 {result["p50"]:8.2f} p95 {result["p95"]:8.2f} '
+                    f'p99 {result["p99"]:8.2f} мс, '
+                    f'запросов {result["queries"]}'
+                )
+        return results
+
+    def save(self, path, results, options):
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({
+                'runs': options['runs'],
+                'cold': options['cold'],
+                'routes': results,
+            }, file, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temporary, path)
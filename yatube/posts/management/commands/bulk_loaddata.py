@@ -0,0 +1,98 @@
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import connection, transaction
+
+from posts import search
+from posts.dumps import iter_json_objects, raw_dates
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает дампы JSON и NDJSON пачками bulk_create; '
+        'уже существующие строки пропускаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help='Файлы дампов')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк одной модели вставлять за раз'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.loaded = Counter()
+        started = time.monotonic()
+        with transaction.atomic():
+            search.drop_triggers(connection)
+            with connection.constraint_checks_disabled():
+                for path in options['fixtures']:
+                    with open(path, encoding='utf-8') as file:
+                        self.load(Deserializer(
+                            iter_json_objects(file), ignorenonexistent=True
+                        ))
+            models = list(self.loaded)
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in models]
+            )
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), models
+                ):
+                    cursor.execute(sql)
+            search.rebuild_index(connection)
+            search.install_triggers(connection)
+        loaded_in = time.monotonic() - started
+        call_command('recount_user_stats', stdout=self.stdout)
+        call_command('rebuild_follow_feed', stdout=self.stdout)
+        cache.clear()
+        rows = sum(self.loaded.values())
+        for model, count in self.loaded.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {rows} за {loaded_in:.1f} с '
+            f'({rows / loaded_in if loaded_in else 0:.0f} строк/с), '
+            f'всего с пересчётами {time.monotonic() - started:.1f} с'
+        ))
+
+    def load(self, objects):
+        batch = []
+        for obj in objects:
+            if batch and (
+                type(obj.object) is not type(batch[0].object)
+                or len(batch) >= self.batch_size
+            ):
+                self.flush(batch)
+                batch = []
+            batch.append(obj)
+        if batch:
+            self.flush(batch)
+
+    def flush(self, batch):
+        model = type(batch[0].object)
+        existing = set(model._base_manager.filter(
+            pk__in=[obj.object.pk for obj in batch]
+        ).values_list('pk', flat=True))
+        batch = [obj for obj in batch if obj.object.pk not in existing]
+        if not batch:
+            return
+        objects = [obj.object for obj in batch]
+        with raw_dates(model, objects):
+            model._base_manager.bulk_create(objects)
+        for name in batch[0].m2m_data:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            through._base_manager.bulk_create([
+                through(**{source: obj.object.pk, target: pk})
+                for obj in batch
+                for pk in obj.m2m_data.get(name, ())
+            ])
+        self.loaded[model] += len(batch)
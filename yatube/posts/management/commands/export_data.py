@@ -0,0 +1,46 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (
+    CHUNK_SIZE, EXPORTS, FORMATS, ExportError, export_rows, render_lines
+)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORTS)
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--author', help='Имя пользователя автора')
+        parser.add_argument('--group', help='Слаг группы')
+        parser.add_argument('--since', help='С даты, ГГГГ-ММ-ДД')
+        parser.add_argument('--until', help='По дату включительно')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            rows = export_rows(
+                options['kind'],
+                author=options['author'],
+                group=options['group'],
+                since=options['since'],
+                until=options['until'],
+                chunk_size=options['chunk_size'],
+            )
+        except ExportError as error:
+            raise CommandError(error)
+        lines = render_lines(options['kind'], rows, options['format'])
+        if not options['output']:
+            write = partial(self.stdout.write, ending='')
+            for line in lines:
+                write(line)
+            return
+        with open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        ) as file:
+            file.writelines(lines)
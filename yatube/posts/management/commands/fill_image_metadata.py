@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from posts import cache
+from posts.models import Post
+from posts.thumbnails import EMPTY_IMAGE_METADATA, image_metadata
+
+
+class Command(BaseCommand):
+    help = 'Заполняет размеры, цвет и превью картинок у старых постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Сколько постов обрабатывать за один проход'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать и те посты, у которых данные уже есть'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').select_related(
+            'author', 'group'
+        ).only('image', 'author__username', 'group__slug').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(image_width__isnull=True)
+        last_pk, filled, failed = 0, 0, 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for post in batch:
+                try:
+                    with post.image.open('rb') as file:
+                        metadata = image_metadata(file)
+                except OSError:
+                    metadata = EMPTY_IMAGE_METADATA
+                for name, value in metadata.items():
+                    setattr(post, name, value)
+                if post.image_width is None:
+                    failed += 1
+                else:
+                    filled += 1
+            Post.objects.bulk_update(batch, list(EMPTY_IMAGE_METADATA))
+            cache.bump_posts(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено картинок: {filled}, не удалось прочитать: {failed}'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import rebuild_feed
+from posts.models import Follow, GroupFollow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            user_ids = User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('pk', flat=True)
+        else:
+            user_ids = Follow.objects.values_list('user_id', flat=True).union(
+                GroupFollow.objects.values_list('user_id', flat=True)
+            ).order_by('user_id')
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            rebuild_feed(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {rebuilt}'))
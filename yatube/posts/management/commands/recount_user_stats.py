@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import FIELDS, counted_users
+from posts.models import User, UserStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и чинит счётчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пользователей пересчитывать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk, checked, repaired = 0, 0, 0
+        while True:
+            batch = list(counted_users(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+            ).values('pk', *FIELDS)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+            checked += len(batch)
+            repaired += self.repair(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено пользователей: {checked}, исправлено: {repaired}'
+        ))
+
+    @transaction.atomic
+    def repair(self, batch):
+        existing = UserStats.objects.in_bulk([row['pk'] for row in batch])
+        changed, missing = [], []
+        for row in batch:
+            user_id = row.pop('pk')
+            stats = existing.get(user_id)
+            if stats is None:
+                missing.append(UserStats(user_id=user_id, **row))
+            elif any(getattr(stats, name) != row[name] for name in row):
+                for name, value in row.items():
+                    setattr(stats, name, value)
+                changed.append(stats)
+        UserStats.objects.bulk_update(changed, list(FIELDS))
+        UserStats.objects.bulk_create(missing)
+        return len(changed) + len(missing)
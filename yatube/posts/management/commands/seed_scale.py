@@ -0,0 +1,283 @@
+import datetime as dt
+import random
+import time
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageOps
+
+from posts import search
+from posts.cache import bump
+from posts.dumps import raw_dates
+from posts.following import followed_groups_key, following_key
+from posts.models import Comment, Follow, Group, Post, User
+from posts.streams import AUTHOR, GROUP, stream_key
+from posts.thumbnails import image_metadata
+
+POOL_SIZE: int = 2000
+# Сколько ключей удалять одним запросом: старые SQLite принимают не больше
+# 999 параметров
+FORGET_BATCH: int = 900
+IMAGE_SIZE = (960, 540)
+PASSWORD = 'password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными production-масштаба для бенчмарков: '
+        'одинаковыми при одинаковом --seed'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Сколько пользователей создать'),
+            ('groups', 20, 'Сколько групп создать'),
+            ('posts', 10000, 'Сколько постов создать'),
+            ('follows', 20000, 'Сколько подписок создать'),
+            ('comments', 20000, 'Сколько комментариев создать'),
+            ('images', 20, 'Сколько разных картинок сгенерировать'),
+            ('seed', 1, 'Зерно генератора'),
+            ('batch-size', 5000, 'Сколько строк вставлять за раз'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.1,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона для подписчиков и комментариев'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --end распределить посты'
+        )
+        parser.add_argument(
+            '--end', default='2025-01-01',
+            help='Дата самого свежего поста, ГГГГ-ММ-ДД'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.end = timezone.make_aware(
+            dt.datetime.fromisoformat(options['end'])
+        )
+        self.span = dt.timedelta(days=options['days'])
+        started = time.monotonic()
+        search.drop_triggers(connection)
+        try:
+            users = self.stage('Пользователи', User, self.users)
+            groups = self.stage('Группы', Group, self.groups)
+            images = self.images()
+            posts = self.stage(
+                'Посты', Post, lambda first: self.posts(
+                    first, users, groups, images
+                )
+            )
+            self.stage('Подписки', Follow, lambda first: self.follows(users))
+            self.stage(
+                'Комментарии', Comment, lambda first: self.comments(
+                    users, posts
+                )
+            )
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Group, Post, Follow, Comment]
+                ):
+                    cursor.execute(sql)
+        finally:
+            search.install_triggers(connection)
+        search.rebuild_index(connection)
+        call_command('recount_user_stats', stdout=self.stdout)
+        call_command('rebuild_follow_feed', stdout=self.stdout)
+        self.forget(users, groups)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
+
+    def forget(self, users, groups):
+        """Сбрасывает кеш, устаревший после вставки в обход сигналов.
+
+        Кеш общий с работающим сайтом, поэтому он не очищается целиком:
+        поднимается версия главной, а множества подписок и потоки постов
+        убираются только у созданных пользователей и групп — их id могли
+        остаться в кеше от удалённых раньше записей.
+        """
+        bump('posts')
+        keys = [
+            key for pk in users for key in (
+                following_key(pk),
+                followed_groups_key(pk),
+                stream_key(AUTHOR, pk),
+            )
+        ] + [stream_key(GROUP, pk) for pk in groups]
+        for start in range(0, len(keys), FORGET_BATCH):
+            cache.delete_many(keys[start:start + FORGET_BATCH])
+
+    def stage(self, title, model, rows):
+        """Вставляет строки пачками и возвращает id вставленных."""
+        first = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        started, count, batch = time.monotonic(), 0, []
+        with transaction.atomic():
+            for obj in rows(first):
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    count += self.insert(model, batch)
+                    batch = []
+            count += self.insert(model, batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{title}: {count} за {elapsed:.1f} с '
+            f'({count / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+        return range(first, first + count)
+
+    def insert(self, model, batch):
+        with raw_dates(model, batch):
+            model.objects.bulk_create(batch)
+        return len(batch)
+
+    def pool(self, make):
+        return [make() for _ in range(POOL_SIZE)]
+
+    def zipf_weights(self, size):
+        """Накопленные веса степенного закона в случайном порядке рангов.
+
+        Так самые популярные авторы и посты разбросаны по всем id,
+        а не сосредоточены в начале.
+        """
+        ranks = list(range(1, size + 1))
+        self.random.shuffle(ranks)
+        alpha = self.options['alpha']
+        return list(accumulate(rank ** -alpha for rank in ranks))
+
+    def users(self, first):
+        password = make_password(PASSWORD)
+        first_names = self.pool(self.faker.first_name)
+        last_names = self.pool(self.faker.last_name)
+        for pk in range(first, first + self.options['users']):
+            yield User(
+                pk=pk,
+                username=f'seed{self.options["seed"]}_{pk}',
+                first_name=self.random.choice(first_names),
+                last_name=self.random.choice(last_names),
+                password=password,
+                date_joined=self.end - self.span,
+            )
+
+    def groups(self, first):
+        for pk in range(first, first + self.options['groups']):
+            yield Group(
+                pk=pk,
+                title=self.faker.catch_phrase()[:200],
+                slug=f'seed{self.options["seed"]}-{pk}',
+                description=self.faker.paragraph(),
+            )
+
+    def images(self):
+        """Сгенерированные градиенты с уже посчитанными размерами и цветом."""
+        images = []
+        for number in range(self.options['images']):
+            name = f'posts/seed/{self.options["seed"]}_{number}.jpg'
+            colors = [
+                tuple(self.random.randrange(256) for _ in range(3))
+                for _ in range(2)
+            ]
+            angle = self.random.randrange(360)
+            if not default_storage.exists(name):
+                gradient = Image.linear_gradient('L').rotate(angle).resize(
+                    IMAGE_SIZE
+                )
+                buffer = BytesIO()
+                ImageOps.colorize(gradient, *colors).save(
+                    buffer, 'JPEG', quality=80
+                )
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            with default_storage.open(name) as file:
+                images.append((name, image_metadata(file)))
+        return images
+
+    def post_date(self, index):
+        """Посты идут по времени в том же порядке, что и по id."""
+        step = self.span / max(self.options['posts'], 1)
+        return self.end - self.span + step * index
+
+    def posts(self, first, users, groups, images):
+        texts = self.pool(lambda: self.faker.text(max_nb_chars=400))
+        weights = self.zipf_weights(len(users))
+        for index in range(self.options['posts']):
+            pub_date = self.post_date(index)
+            post = Post(
+                pk=first + index,
+                text=self.random.choice(texts),
+                pub_date=pub_date,
+                updated=pub_date,
+                author_id=self.random.choices(users, cum_weights=weights)[0],
+                group_id=(
+                    self.random.choice(groups)
+                    if groups and self.random.random() < 0.6 else None
+                ),
+            )
+            if images and self.random.random() < self.options['image_ratio']:
+                post.image, metadata = self.random.choice(images)
+                for name, value in metadata.items():
+                    setattr(post, name, value)
+            yield post
+
+    def follows(self, users):
+        """Подписки со степенным распределением числа подписчиков.
+
+        Каждый пользователь подписывается на одинаковое число авторов, но
+        авторы выбираются по весам Ципфа; повторы отбрасываются на месте,
+        поэтому память не растёт с числом подписок.
+        """
+        if len(users) < 2:
+            return
+        weights = self.zipf_weights(len(users))
+        per_user, extra = divmod(self.options['follows'], len(users))
+        for index, user_id in enumerate(users):
+            wanted = min(per_user + (index < extra), len(users) - 1)
+            authors = set()
+            while len(authors) < wanted:
+                for author_id in self.random.choices(
+                    users, cum_weights=weights, k=wanted - len(authors)
+                ):
+                    if author_id != user_id:
+                        authors.add(author_id)
+            for author_id in sorted(authors):
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    def comments(self, users, posts):
+        if not posts:
+            return
+        texts = self.pool(self.faker.sentence)
+        weights = self.zipf_weights(len(posts))
+        for _ in range(self.options['comments']):
+            index = self.random.choices(
+                range(len(posts)), cum_weights=weights
+            )[0]
+            yield Comment(
+                post_id=posts[index],
+                author_id=self.random.choice(users),
+                text=self.random.choice(texts),
+                created=self.post_date(index) + dt.timedelta(
+                    minutes=self.random.randrange(1, 60 * 24 * 7)
+                ),
+            )
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+FILL_BATCH = 1000
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('*')).values('total'),
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+
+
+def fill_stats(apps, schema_editor):
+    """Заполняет таблицу одним запросом с подзапросами-счётчиками вместо
+    четырёх COUNT на каждого пользователя."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    Comment = apps.get_model('posts', 'Comment')
+    users = User.objects.order_by().annotate(
+        posts_count=_count(Post, 'author'),
+        following_count=_count(Follow, 'user'),
+        followers_count=_count(Follow, 'author'),
+        comments_count=_count(Comment, 'author'),
+    ).values_list(
+        'pk', 'posts_count', 'following_count', 'followers_count',
+        'comments_count',
+    )
+    batch = []
+    for pk, posts, following, followers, comments in users.iterator():
+        batch.append(UserStats(
+            user_id=pk,
+            posts_count=posts,
+            following_count=following,
+            followers_count=followers,
+            comments_count=comments,
+        ))
+        if len(batch) == FILL_BATCH:
+            UserStats.objects.bulk_create(batch)
+            batch = []
+    UserStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
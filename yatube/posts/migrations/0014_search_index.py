@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# SQL записан здесь целиком, а не берётся из posts.search: правки модуля не
+# должны менять то, что делает уже применённая миграция.
+INDEXED_TABLES = ('posts_post', 'posts_comment')
+CREATE_INDEX = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+        text, content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+'''
+CREATE_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert
+    AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete
+    AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update
+    AFTER UPDATE OF text ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+)
+REBUILD_INDEX = "INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')"
+TRIGGER_ACTIONS = ('insert', 'delete', 'update')
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in INDEXED_TABLES:
+        schema_editor.execute(CREATE_INDEX.format(table=table))
+        for sql in CREATE_TRIGGERS:
+            schema_editor.execute(sql.format(table=table))
+        schema_editor.execute(REBUILD_INDEX.format(table=table))
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in INDEXED_TABLES:
+        for action in TRIGGER_ACTIONS:
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS {table}_fts_{action}'
+            )
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_image_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:51
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_subscriptions(apps, schema_editor):
+    apps.get_model('posts', 'UserStats').objects.update(
+        subscriptions_count=F('following_count') + F('group_following_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_groupfollow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='subscriptions_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Подписок на авторов и группы'),
+        ),
+        migrations.RunPython(fill_subscriptions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['subscriptions_count'], name='userstats_subscriptions_idx'),
+        ),
+    ]
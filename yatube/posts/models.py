@@ -11,6 +11,7 @@ class Group(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [models.Index(fields=['title'], name='group_title_idx')]
         verbose_name = 'Группа'
         verbose_name_plural = 'Группы'
 
@@ -27,6 +28,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True,
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -45,9 +50,36 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    image_color = models.CharField(
+        'Средний цвет картинки', max_length=7, blank=True, editable=False
+    )
+    image_placeholder = models.TextField(
+        'Превью картинки', blank=True, editable=False,
+        help_text='Крошечная копия картинки в виде data URI'
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        # Ленты листаются по (pub_date, id) с отбором по автору или группе
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -76,6 +108,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -100,6 +138,13 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        # unique_follow покрывает (user, author); подписчиков автора
+        # ищем по обратной паре
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'author'), name='unique_follow'),
@@ -111,3 +156,105 @@ class Follow(models.Model):
 
     def __str__(self):
         return self.user.username
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='group_follows',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик'
+    )
+    group = models.ForeignKey(
+        Group,
+        related_name='followers',
+        on_delete=models.CASCADE,
+        verbose_name='Группа'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка на группу'
+        verbose_name_plural = 'Подписки на группы'
+        # unique_group_follow покрывает (user, group); подписчиков группы
+        # ищем по обратной паре
+        indexes = [
+            models.Index(
+                fields=['group', 'user'], name='group_follow_group_user_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'group'), name='unique_group_follow'),
+        ]
+
+    def __str__(self):
+        return self.user.username
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='feed',
+        on_delete=models.CASCADE,
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_feed_item'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    group_following_count = models.PositiveIntegerField(
+        'Подписок на группы', default=0
+    )
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    # Сумма подписок на авторов и группы: по ней posts.feed индексом
+    # находит читателей, чья лента собирается при чтении.
+    subscriptions_count = models.PositiveIntegerField(
+        'Подписок на авторов и группы', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+        indexes = [
+            models.Index(
+                fields=['subscriptions_count'],
+                name='userstats_subscriptions_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.user_id)
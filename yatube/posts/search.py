@@ -0,0 +1,196 @@
+import base64
+import json
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+COMMENT_WEIGHT: float = 0.5
+MAX_TERMS: int = 10
+SNIPPET_TOKENS: int = 16
+MARK_START, MARK_END = '\x01', '\x02'
+
+# Внешние FTS5-индексы (создаёт миграция 0014_search_index): текст хранится
+# только в posts_post и posts_comment, а триггеры держат индекс в согласии с
+# ними при любой записи, включая bulk_create и update().
+INDEXED_TABLES = ('posts_post', 'posts_comment')
+CREATE_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert
+    AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete
+    AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update
+    AFTER UPDATE OF text ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+)
+
+SEARCH = '''
+    WITH matches (post_id, score) AS (
+        SELECT rowid, bm25(posts_post_fts)
+        FROM posts_post_fts WHERE posts_post_fts MATCH %s
+        UNION ALL
+        SELECT comment.post_id, bm25(posts_comment_fts) * %s
+        FROM posts_comment_fts
+        JOIN posts_comment AS comment ON comment.id = posts_comment_fts.rowid
+        WHERE posts_comment_fts MATCH %s
+    ), ranked AS (
+        SELECT post_id, MIN(score) AS score FROM matches GROUP BY post_id
+    )
+    SELECT post_id, score FROM ranked
+    {where}
+    ORDER BY score, post_id
+    LIMIT %s
+'''
+AFTER_CURSOR = 'WHERE score > %s OR (score = %s AND post_id > %s)'
+HIGHLIGHT_POSTS = '''
+    SELECT rowid, highlight(posts_post_fts, 0, %s, %s)
+    FROM posts_post_fts
+    WHERE posts_post_fts MATCH %s AND rowid IN ({ids})
+'''
+SNIPPET_COMMENTS = '''
+    SELECT comment.post_id,
+           snippet(posts_comment_fts, 0, %s, %s, '…', %s)
+    FROM posts_comment_fts
+    JOIN posts_comment AS comment ON comment.id = posts_comment_fts.rowid
+    WHERE posts_comment_fts MATCH %s AND comment.post_id IN ({ids})
+    ORDER BY bm25(posts_comment_fts)
+'''
+
+
+def drop_triggers(db):
+    """Снимает триггеры, чтобы массовая загрузка не обновляла индекс."""
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        for table in INDEXED_TABLES:
+            for action in ('insert', 'delete', 'update'):
+                cursor.execute(
+                    f'DROP TRIGGER IF EXISTS {table}_fts_{action}'
+                )
+
+
+def rebuild_index(db):
+    """Перестраивает индекс целиком по содержимому таблиц."""
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        for table in INDEXED_TABLES:
+            cursor.execute(
+                f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')"
+            )
+
+
+def install_triggers(db):
+    """Ставит триггеры заново, если их нет.
+
+    SQLite-бэкенд Django пересоздаёт таблицу при многих изменениях схемы,
+    и её триггеры пропадают вместе со старой таблицей.
+    """
+    if db.vendor != 'sqlite':
+        return
+    existing = set(db.introspection.table_names())
+    with db.cursor() as cursor:
+        for table in INDEXED_TABLES:
+            if f'{table}_fts' not in existing:
+                continue
+            for sql in CREATE_TRIGGERS:
+                cursor.execute(sql.format(table=table))
+
+
+def match_expression(query):
+    """Запрос пользователя как FTS5-выражение: все слова, по префиксу."""
+    terms = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def encode_cursor(score, post_id):
+    payload = json.dumps([score, post_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        score, post_id = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )
+        return float(score), int(post_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _marked(text):
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def search_posts(query, cursor=None, limit=10):
+    """Посты по релевантности с подсветкой и курсор следующей страницы.
+
+    Пост находится и по своему тексту, и по комментариям к нему; совпадения
+    в комментариях весят меньше. Страницы листаются по паре (ранг, id).
+    """
+    match = match_expression(query)
+    if not match:
+        return [], None
+    where, params = '', [match, COMMENT_WEIGHT, match]
+    position = decode_cursor(cursor)
+    if position is not None:
+        score, post_id = position
+        where = AFTER_CURSOR
+        params += [score, score, post_id]
+    with connection.cursor() as db:
+        db.execute(SEARCH.format(where=where), params + [limit + 1])
+        rows = db.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(*rows[-1][::-1])
+        ids = [post_id for post_id, _ in rows]
+        if not ids:
+            return [], None
+        placeholders = ', '.join(['%s'] * len(ids))
+        db.execute(
+            HIGHLIGHT_POSTS.format(ids=placeholders),
+            [MARK_START, MARK_END, match, *ids]
+        )
+        highlights = dict(db.fetchall())
+        db.execute(
+            SNIPPET_COMMENTS.format(ids=placeholders),
+            [MARK_START, MARK_END, SNIPPET_TOKENS, match, *ids]
+        )
+        snippets = {}
+        for post_id, snippet in db.fetchall():
+            snippets.setdefault(post_id, snippet)
+    posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+    results = []
+    for post_id in ids:
+        post = posts.get(post_id)
+        if post is None:
+            continue
+        post.highlighted = _marked(highlights.get(post_id, post.text))
+        if post_id in snippets:
+            post.comment_snippet = _marked(snippets[post_id])
+        results.append(post)
+    return results, next_cursor
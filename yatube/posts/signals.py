@@ -0,0 +1,167 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache, counters, feed, search, streams, thumbnails
+from .following import forget_followed_groups, forget_following
+from .models import (
+    Comment, Follow, Group, GroupFollow, Post, User, UserStats
+)
+
+
+def bump(scope, ident=''):
+    # Версия поднимается только после фиксации транзакции: иначе GET из
+    # другого потока может прочитать новую версию, отрисовать страницу по
+    # снимку до записи и закешировать устаревшую страницу под новой версией.
+    transaction.on_commit(partial(cache.bump, scope, ident))
+
+
+def bump_post_feeds(post, group_slugs=()):
+    bump('posts')
+    bump('post', post.pk)
+    bump('user', post.author_id)
+    bump('author', post.author.username)
+    for slug in {*group_slugs, post.group and post.group.slug} - {None}:
+        bump('group', slug)
+
+
+def thumbnails_ready(post):
+    # Карточка поста кешируется по updated, а не по наличию миниатюры:
+    # готовая миниатюра меняет карточку, поэтому двигает и updated.
+    Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+    bump_post_feeds(post)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        bump('posts')
+        bump('titles')
+        bump('author', instance.username)
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, **kwargs):
+    instance.image_uploaded = bool(instance.image) and not (
+        instance.image._committed
+    )
+    if instance.image_uploaded or not instance.image:
+        metadata = (
+            thumbnails.image_metadata(instance.image)
+            if instance.image_uploaded else thumbnails.EMPTY_IMAGE_METADATA
+        )
+        for name, value in metadata.items():
+            setattr(instance, name, value)
+    instance.previous_group_id = instance.previous_group_slug = None
+    if instance.pk:
+        instance.previous_group_id, instance.previous_group_slug = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'group__slug'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+    elif instance.group_id != instance.previous_group_id:
+        feed.regroup_post(instance)
+    transaction.on_commit(partial(
+        streams.forget_post_streams, instance, instance.previous_group_id
+    ))
+    bump_post_feeds(instance, [instance.previous_group_slug])
+    if instance.image_uploaded:
+        transaction.on_commit(partial(
+            thumbnails.schedule_thumbnails,
+            instance.image.name,
+            on_ready=partial(thumbnails_ready, instance)
+        ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.shift(instance.author_id, posts_count=-1)
+    transaction.on_commit(partial(streams.forget_post_streams, instance))
+    bump_post_feeds(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(instance.author_id, comments_count=1)
+    bump('post', instance.post_id)
+    bump('author', instance.author.username)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift(instance.author_id, comments_count=-1)
+    bump('post', instance.post_id)
+    bump('author', instance.author.username)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(instance.user_id, following_count=1)
+        counters.shift(instance.author_id, followers_count=1)
+        feed.backfill_follow(instance)
+        transaction.on_commit(partial(forget_following, instance.user_id))
+    bump('author', instance.user.username)
+    bump('author', instance.author.username)
+    bump('following', instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.shift(instance.user_id, following_count=-1)
+    counters.shift(instance.author_id, followers_count=-1)
+    feed.prune_follow(instance)
+    transaction.on_commit(partial(forget_following, instance.user_id))
+    bump('author', instance.user.username)
+    bump('author', instance.author.username)
+    bump('following', instance.user_id)
+
+
+@receiver(post_save, sender=GroupFollow)
+def group_follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(instance.user_id, group_following_count=1)
+        feed.backfill_group_follow(instance)
+        transaction.on_commit(
+            partial(forget_followed_groups, instance.user_id)
+        )
+    bump('following', instance.user_id)
+
+
+@receiver(post_delete, sender=GroupFollow)
+def group_follow_deleted(sender, instance, **kwargs):
+    counters.shift(instance.user_id, group_following_count=-1)
+    feed.prune_group_follow(instance)
+    transaction.on_commit(partial(forget_followed_groups, instance.user_id))
+    bump('following', instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # Название группы есть на карточках главной и профилей, а удаление
+    # обнуляет group у постов одним UPDATE, без сигналов Post.
+    bump('posts')
+    bump('titles')
+    bump('group', instance.slug)
+
+
+@receiver(post_migrate)
+def search_triggers_restored(sender, using, **kwargs):
+    if sender.label == 'posts':
+        search.install_triggers(connections[using])
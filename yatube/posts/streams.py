@@ -0,0 +1,168 @@
+"""Лента подписок, собираемая при чтении.
+
+Читателю с сотнями подписок материализованная лента (posts.feed) дорога:
+каждый пост его авторов и групп пишется в неё отдельной строкой, а прямой
+запрос по подпискам сортирует все их посты ради одной страницы. Вместо
+этого у каждого автора и каждой группы в кеше лежит поток последних
+постов — пары (pub_date, id) по убыванию, — и страница получается
+k-путевым слиянием потоков через heapq.merge. Глубже закешированного
+потока читаются индексы post_author_pub_date_idx и post_group_pub_date_idx.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .feed import subscribed_posts
+from .following import followed_group_ids, following_ids
+from .models import Post
+from .utils import (
+    NEXT, NUMBER_OF_POST, CursorPaginator, get_paginator_obj
+)
+
+
+AUTHOR = 'author'
+GROUP = 'group'
+# Источник потока и поле поста, по которому он отбирается
+SOURCES = {AUTHOR: 'author_id', GROUP: 'group_id'}
+
+
+def stream_key(source, ident):
+    return f'{source}_stream:{ident}'
+
+
+def _source_posts(source, ident):
+    return Post.objects.filter(**{SOURCES[source]: ident}).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pub_date', 'pk')
+
+
+def load_streams(sources):
+    """Потоки: {(источник, id): [(pub_date, id поста), ...]} по убыванию.
+
+    Потоки, которых нет в кеше, читаются по одному запросу на источник и
+    кладутся обратно; сбрасывает их forget_post_streams при правке постов.
+    """
+    keys = {stream_key(*source): source for source in sources}
+    streams = {
+        keys[key]: stream for key, stream in cache.get_many(keys).items()
+    }
+    missing = {}
+    for key, source in keys.items():
+        if source not in streams:
+            streams[source] = missing[key] = list(
+                _source_posts(*source)[:settings.FEED_STREAM_DEPTH]
+            )
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+    return streams
+
+
+def forget_post_streams(post, *group_ids):
+    """Сбрасывает потоки автора поста, его группы и групп group_ids."""
+    cache.delete_many(
+        [stream_key(AUTHOR, post.author_id)]
+        + [
+            stream_key(GROUP, group_id)
+            for group_id in {post.group_id, *group_ids} - {None}
+        ]
+    )
+
+
+def _after(queryset, values):
+    moment, pk = values
+    return queryset.filter(
+        Q(pub_date__lt=moment) | Q(pub_date=moment, pk__lt=pk)
+    )
+
+
+def _older(source, stream, values, limit):
+    """До limit постов источника старше values, по убыванию."""
+    tail = stream if values is None else [
+        entry for entry in stream if entry < values
+    ]
+    if len(tail) >= limit or len(stream) < settings.FEED_STREAM_DEPTH:
+        return tail[:limit]
+    # Поток обрезан раньше, чем набралась страница: дальше читаем индекс
+    rest = _after(_source_posts(*source), tail[-1] if tail else values)
+    return tail + list(rest[:limit - len(tail)])
+
+
+def _newer(source, stream, values, limit):
+    """До limit ближайших к values постов источника новее values, по
+    возрастанию."""
+    if len(stream) < settings.FEED_STREAM_DEPTH or stream[-1] <= values:
+        return [entry for entry in reversed(stream) if entry > values][:limit]
+    moment, pk = values
+    return list(_source_posts(*source).filter(
+        Q(pub_date__gt=moment) | Q(pub_date=moment, pk__gt=pk)
+    ).order_by('pub_date', 'pk')[:limit])
+
+
+def _distinct(entries):
+    # Пост автора из группы, на которую тоже есть подписка, приходит из
+    # двух потоков; после слияния повторы стоят рядом.
+    previous = None
+    for entry in entries:
+        if entry != previous:
+            yield entry
+        previous = entry
+
+
+def merge_streams(streams, direction, values, limit):
+    """Первые limit пар (pub_date, id) за values в порядке обхода."""
+    if direction == NEXT:
+        tails = [
+            _older(source, stream, values, limit)
+            for source, stream in streams.items()
+        ]
+        merged = heapq.merge(*tails, reverse=True)
+    else:
+        tails = [
+            _newer(source, stream, values, limit)
+            for source, stream in streams.items()
+        ]
+        merged = heapq.merge(*tails)
+    return list(islice(_distinct(merged), limit))
+
+
+class MergedFeedPaginator(CursorPaginator):
+    """Курсорная пагинация по слиянию потоков авторов и групп.
+
+    object_list — пары (источник, id); курсоры те же, что у
+    CursorPaginator по (pub_date, id), поэтому шаблон пагинации не
+    меняется.
+    """
+
+    def _rows(self, direction, values, limit):
+        entries = merge_streams(
+            load_streams(self.object_list), direction, values, limit
+        )
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for _, pk in entries]
+        )
+        return [posts[pk] for _, pk in entries if pk in posts]
+
+
+def subscriptions(user):
+    """Источники ленты пользователя: его авторы и группы."""
+    return [(AUTHOR, ident) for ident in sorted(following_ids(user))] + [
+        (GROUP, ident) for ident in sorted(followed_group_ids(user))
+    ]
+
+
+def feed_page(user, request, per_page=NUMBER_OF_POST):
+    """Страница ленты подписок пользователя, слитая из потоков.
+
+    Старые ссылки вида ?page=N обслуживаются прямым запросом с OFFSET.
+    """
+    if 'page' in request.GET and 'cursor' not in request.GET:
+        return get_paginator_obj(
+            subscribed_posts(user.pk).select_related('author', 'group'),
+            request,
+            per_page=per_page
+        )
+    paginator = MergedFeedPaginator(subscriptions(user), per_page)
+    return paginator.get_page(request.GET.get('cursor'))
@@ -0,0 +1,13 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, alias):
+    """Готовая миниатюра картинки поста или None, пока она готовится."""
+    if not post.image:
+        return None
+    return thumbnails.ready_thumbnail(post.image, alias)
@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from users.urls import urlpatterns as users_urlpatterns
+from ..benchmark import regressions, routes, subjects
+from ..following import followed_groups_key, following_key
+from ..models import Comment, Follow, Group, Post, User
+from ..urls import urlpatterns as posts_urlpatterns
+
+RUNS: int = 3
+
+
+class RouteBenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(
+            text='Пост о погоде', author=cls.author, group=group
+        )
+        Comment.objects.create(text='Ответ', author=cls.reader, post=post)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.baseline = os.path.join(self.temp_dir, 'baseline.json')
+        if os.path.exists(self.baseline):
+            os.remove(self.baseline)
+
+    def bench(self, **options):
+        call_command(
+            'bench_routes', runs=RUNS, warmup=0, baseline=self.baseline,
+            stdout=StringIO(), **options
+        )
+
+    def test_every_route_is_measured(self):
+        """Замер покрывает все именованные маршруты posts и users"""
+        names = {
+            f'posts:{pattern.name}' for pattern in posts_urlpatterns
+        } | {f'users:{pattern.name}' for pattern in users_urlpatterns}
+        self.assertEqual(set(routes(*subjects()[1:])), names)
+
+    def test_cold_run_keeps_site_cache(self):
+        """Замер с --cold не очищает кеш работающего сайта"""
+        cache.set('site:probe', True)
+        self.bench(cold=True)
+        self.assertTrue(cache.get('site:probe'))
+
+    def test_baseline_written_and_database_untouched(self):
+        """Первый прогон пишет базовую линию и не меняет данные"""
+        self.bench()
+        with open(self.baseline) as file:
+            saved = json.load(file)['routes']
+        self.assertEqual(saved['anonymous:posts:index']['status'], 200)
+        self.assertEqual(saved['authorized:posts:follow_index']['status'], 200)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        self.assertIsNone(cache.get(following_key(self.reader.pk)))
+        self.assertIsNone(cache.get(followed_groups_key(self.reader.pk)))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_more_queries_fail_the_run(self):
+        """Рост числа запросов относительно базовой линии — ошибка"""
+        self.bench()
+        with open(self.baseline) as file:
+            saved = json.load(file)
+        saved['routes']['authorized:posts:follow_index']['queries'] = 0
+        with open(self.baseline, 'w') as file:
+            json.dump(saved, file)
+        with self.assertRaisesMessage(CommandError, 'follow_index'):
+            self.bench()
+
+    def test_small_latency_changes_are_noise(self):
+        """Рост времени в пределах порога или пары мс не считается"""
+        base = {'status': 200, 'queries': 2, 'p50': 1.0, 'p95': 2.0}
+        for current, expected in (
+            ({'p50': 2.5, 'p95': 3.5}, 0),
+            ({'p50': 1.0, 'p95': 9.0}, 1),
+            ({'p50': 9.0, 'p95': 9.0}, 2),
+        ):
+            with self.subTest(current=current):
+                found = regressions(
+                    {'route': base}, {'route': {**base, **current}}, 0.5
+                )
+                self.assertEqual(len(found), expected)
@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..dumps import iter_json_objects
+from ..models import FeedItem, Post, User, UserStats
+from ..search import search_posts
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+PUB_DATE = '2022-11-17T20:30:00Z'
+ROWS = [
+    {'model': 'auth.user', 'pk': 101, 'fields': {
+        'username': 'loaded_author', 'password': '!', 'groups': [],
+        'user_permissions': [],
+    }},
+    {'model': 'auth.user', 'pk': 102, 'fields': {
+        'username': 'loaded_reader', 'password': '!', 'groups': [],
+        'user_permissions': [],
+    }},
+    {'model': 'posts.group', 'pk': 101, 'fields': {
+        'title': 'Группа', 'slug': 'loaded', 'description': 'Описание',
+    }},
+    {'model': 'posts.post', 'pk': 101, 'fields': {
+        'text': 'Загруженный пост', 'pub_date': PUB_DATE, 'author': 101,
+        'group': 101, 'image': '',
+    }},
+    {'model': 'posts.follow', 'pk': 101, 'fields': {
+        'user': 102, 'author': 101,
+    }},
+]
+
+
+class BulkLoadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_iter_json_objects_reads_by_chunks(self):
+        """Массив и NDJSON разбираются одинаково при любом размере куска"""
+        array = json.dumps(ROWS, ensure_ascii=False, indent=2)
+        lines = '\n'.join(json.dumps(row) for row in ROWS)
+        for text in (array, lines):
+            with self.subTest(text=text[:20]):
+                self.assertEqual(
+                    list(iter_json_objects(io.StringIO(text), chunk_size=7)),
+                    ROWS
+                )
+
+    def test_bulk_loaddata(self):
+        """Дамп загружается с исходными датами, счётчиками и лентами"""
+        path = os.path.join(TEMP_DIR, 'dump.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(ROWS, file)
+        call_command('bulk_loaddata', path, batch_size=2, stdout=StringIO())
+        post = Post.objects.get(pk=101)
+        self.assertEqual(
+            post.pub_date.isoformat(), '2022-11-17T20:30:00+00:00'
+        )
+        author = User.objects.get(username='loaded_author')
+        self.assertEqual(UserStats.objects.get(user=author).posts_count, 1)
+        self.assertTrue(
+            FeedItem.objects.filter(user_id=102, post=post).exists()
+        )
+        self.assertEqual(search_posts('загруженный')[0], [post])
@@ -0,0 +1,92 @@
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+AUTHOR_POSTS: int = 3
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(AUTHOR_POSTS):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+        post = Post.objects.create(text='Чужой пост', author=cls.other)
+        Comment.objects.create(
+            text='Комментарий', author=cls.author, post=post
+        )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        return self.client.get(
+            reverse('posts:export_data', kwargs={'kind': kind}), params
+        )
+
+    def lines(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_filters_by_author(self):
+        """Выгрузка отбирает записи по автору и группе"""
+        rows = self.lines(self.export('posts', author='author'))
+        self.assertEqual(len(rows), AUTHOR_POSTS)
+        self.assertEqual(rows[0]['group__slug'], 'group')
+        rows = self.lines(self.export('comments', group='group'))
+        self.assertEqual(rows, [])
+
+    @override_settings(EXPORT_WEB_LIMIT=2)
+    def test_export_limit_and_after(self):
+        """Веб-выгрузка ограничена и продолжается с after"""
+        first = self.lines(self.export('posts'))
+        self.assertEqual(len(first), 2)
+        rest = self.lines(self.export('posts', after=first[-1]['id']))
+        self.assertEqual(len(rest), 2)
+
+    def test_export_csv_and_errors(self):
+        """CSV начинается с заголовка, ошибки в параметрах дают 400"""
+        response = self.export('follows', format='csv')
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('id,user__username'))
+        self.assertEqual(self.export('posts', since='вчера').status_code, 400)
+        self.assertEqual(
+            self.export('posts', until='2024-02-30').status_code, 400
+        )
+        self.assertEqual(self.export('follows', group='g').status_code, 400)
+
+    def test_export_requires_staff(self):
+        """Выгрузка доступна только персоналу"""
+        self.client.force_login(self.author)
+        self.assertEqual(self.export('posts').status_code, 302)
+
+    def test_export_command(self):
+        """Команда export_data пишет NDJSON с отбором по датам"""
+        out = StringIO()
+        call_command(
+            'export_data', 'posts', '--since', '2000-01-01', stdout=out
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), AUTHOR_POSTS + 1)
+        out = StringIO()
+        call_command(
+            'export_data', 'posts', '--until', '2000-01-01', stdout=out
+        )
+        self.assertEqual(out.getvalue(), '')
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_data', 'posts', '--since', '2024-02-30',
+                stdout=StringIO()
+            )
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import FeedItem, Follow, Group, GroupFollow, Post, User
+
+FEED_DEPTH: int = 3
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def feed_posts(self, user):
+        return [item.post for item in FeedItem.objects.filter(user=user)]
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed_posts(self.reader), [post])
+        self.assertEqual(self.feed_posts(self.stranger), [])
+
+    def test_follow_backfills_and_unfollow_prunes_feed(self):
+        """Подписка дозаполняет ленту, отписка её очищает"""
+        old_post = Post.objects.create(text='Старый пост', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_posts(self.reader), [old_post])
+        follow.delete()
+        self.assertEqual(self.feed_posts(self.reader), [])
+
+    @override_settings(FOLLOW_FEED_DEPTH=FEED_DEPTH, FOLLOW_FEED_TRIM_EVERY=1)
+    def test_feed_is_trimmed_to_depth(self):
+        """Лента подписок подрезается до заданной глубины"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(FEED_DEPTH + 2)
+        ]
+        self.assertEqual(
+            self.feed_posts(self.reader),
+            posts[::-1][:FEED_DEPTH]
+        )
+
+    def test_rebuild_command_restores_feed(self):
+        """Команда rebuild_follow_feed восстанавливает ленту"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        FeedItem.objects.all().delete()
+        call_command('rebuild_follow_feed', stdout=StringIO())
+        self.assertEqual(self.feed_posts(self.reader), [post])
+
+
+class GroupFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+
+    def feed_posts(self):
+        return [
+            item.post for item in FeedItem.objects.filter(user=self.reader)
+        ]
+
+    def test_group_post_fans_out_once(self):
+        """Пост группы попадает в ленту один раз и при двух подписках"""
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        self.assertEqual(self.feed_posts(), [post])
+
+    def test_unfollow_keeps_posts_of_other_subscription(self):
+        """Отписка убирает только посты, не покрытые другой подпиской"""
+        group_post = Post.objects.create(
+            text='В группе', author=self.author, group=self.group
+        )
+        plain_post = Post.objects.create(text='Без группы', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        group_follow = GroupFollow.objects.create(
+            user=self.reader, group=self.group
+        )
+        follow.delete()
+        self.assertEqual(self.feed_posts(), [group_post])
+        Follow.objects.create(user=self.reader, author=self.author)
+        group_follow.delete()
+        self.assertEqual(self.feed_posts(), [plain_post, group_post])
+
+    def test_moved_post_leaves_old_group_feed(self):
+        """Пост, перенесённый в другую группу, уходит из ленты прежней"""
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.feed_posts(), [])
+        post.group = self.group
+        post.save()
+        self.assertEqual(self.feed_posts(), [post])
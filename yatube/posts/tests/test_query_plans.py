@@ -0,0 +1,115 @@
+import re
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, GroupFollow, Post, User
+from ..urls import urlpatterns
+
+# Запросы, которые планировщику не с чем сравнивать: служебные команды
+# транзакций и вставки без выборки.
+SKIPPED = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|INSERT INTO \S+ \([^)]*\) VALUES)',
+    re.IGNORECASE
+)
+# Полный просмотр таблицы или сортировка во временном B-дереве
+BAD_STEP = re.compile(
+    r'USE TEMP B-TREE'
+    r'|^SCAN (?!CONSTANT ROW|.*USING (COVERING )?INDEX|.*VIRTUAL TABLE)'
+)
+# Ранжирование по bm25 сортирует найденное по определению
+NOT_CHECKED = {'search'}
+
+
+class QueryPlanTests(TestCase):
+    """Ни один вид не просматривает таблицы целиком и не сортирует в памяти.
+
+    Для каждого запроса вида снимается EXPLAIN QUERY PLAN; новый вид в
+    posts/urls.py нужно добавить в requests(), иначе тест упадёт.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(
+            username='reader', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(text='Ответ', author=cls.reader, post=cls.post)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def requests(self):
+        post = {'pk': self.post.pk}
+        return {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=['group']),
+            'profile': reverse('posts:profile', args=['author']),
+            'post_detail': reverse('posts:post_detail', kwargs=post),
+            'post_comments': reverse('posts:post_comments', kwargs=post),
+            'search': reverse('posts:search') + '?q=пост',
+            'export_data': reverse('posts:export_data', args=['posts']),
+            'post_create': reverse('posts:post_create'),
+            'post_edit': reverse('posts:post_edit', args=[self.post.pk]),
+            'add_comment': reverse('posts:add_comment', args=[self.post.pk]),
+            'follow_index': reverse('posts:follow_index'),
+            'profile_unfollow': reverse(
+                'posts:profile_unfollow', args=['author']
+            ),
+            'profile_follow': reverse('posts:profile_follow', args=['author']),
+            'group_unfollow': reverse('posts:group_unfollow', args=['group']),
+            'group_follow': reverse('posts:group_follow', args=['group']),
+        }
+
+    def plans(self, call):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            call()
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if SKIPPED.match(sql):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def test_every_view_is_checked(self):
+        """Для каждого маршрута posts есть запрос в проверке планов"""
+        self.assertEqual(
+            {pattern.name for pattern in urlpatterns}, set(self.requests())
+        )
+
+    def test_views_use_indexes(self):
+        """Запросы видов идут по индексам, без SCAN и TEMP B-TREE"""
+        for name, url in self.requests().items():
+            if name in NOT_CHECKED:
+                continue
+            for sql, plan in self.plans(partial(self.client.get, url)):
+                with self.subTest(view=name, sql=sql):
+                    self.assertGoodPlan(plan)
+
+    def test_new_post_fan_out_uses_indexes(self):
+        """Раскладка нового поста не просматривает статистику читателей"""
+        for sql, plan in self.plans(partial(
+            Post.objects.create, text='Ещё пост', author=self.author,
+            group=self.group
+        )):
+            with self.subTest(sql=sql):
+                self.assertGoodPlan(plan)
+
+    def assertGoodPlan(self, plan):
+        bad = [step for step in plan if BAD_STEP.search(step)]
+        self.assertEqual(bad, [], '\n'.join(plan))
@@ -0,0 +1,69 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..search import search_posts
+
+POSTS_ON_PAGE: int = 3
+MATCHING_POSTS: int = 7
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(
+            text='Рыбалка на Волге <b>летом</b>', author=cls.user
+        )
+        cls.other = Post.objects.create(text='Про горы', author=cls.user)
+        Comment.objects.create(
+            text='А рыбалка была удачной?', author=cls.user, post=cls.other
+        )
+
+    def test_search_view_highlights_matches(self):
+        """Поиск находит посты по тексту и комментариям и подсвечивает"""
+        response = self.client.get(reverse('posts:search'), {'q': 'рыбал'})
+        posts = response.context['posts']
+        self.assertEqual(posts, [self.post, self.other])
+        self.assertContains(response, '<mark>Рыбалка</mark> на Волге')
+        self.assertContains(response, '&lt;b&gt;летом&lt;/b&gt;')
+        self.assertContains(response, '<mark>рыбалка</mark> была удачной')
+
+    def test_index_follows_updates(self):
+        """Индекс обновляется при правке, удалении и bulk_create"""
+        Post.objects.filter(pk=self.post.pk).update(text='Охота')
+        self.assertEqual(search_posts('рыбалка')[0], [self.other])
+        self.assertEqual(search_posts('охота')[0], [self.post])
+        self.other.comments.all().delete()
+        self.assertEqual(search_posts('рыбалка')[0], [])
+        Post.objects.bulk_create([Post(text='Рыбалка', author=self.user)])
+        self.assertEqual(len(search_posts('рыбалка')[0]), 1)
+
+    def test_keyset_pages_do_not_overlap(self):
+        """Страницы поиска идут по курсору без повторов и пропусков"""
+        Post.objects.bulk_create([
+            Post(text=f'Поход номер {number}', author=self.user)
+            for number in range(MATCHING_POSTS)
+        ])
+        found, cursor = [], None
+        while True:
+            posts, cursor = search_posts('поход', cursor, POSTS_ON_PAGE)
+            found += posts
+            if cursor is None:
+                break
+        self.assertEqual(len(found), MATCHING_POSTS)
+        self.assertEqual(len(set(found)), MATCHING_POSTS)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке ищет по тому же индексу"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'волге'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from ..models import Comment, FeedItem, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+VOLUMES = {
+    'users': 30,
+    'groups': 3,
+    'posts': 200,
+    'follows': 150,
+    'comments': 100,
+    'images': 2,
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedScaleTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self):
+        call_command('seed_scale', seed=7, stdout=StringIO(), **VOLUMES)
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date',
+                'image'
+            )),
+            list(Follow.objects.order_by('pk').values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_seed_volumes_and_derived_data(self):
+        """seed_scale создаёт заданные объёмы и пересчитывает производное"""
+        cache.set('site:probe', True)
+        self.seed()
+        self.assertTrue(cache.get('site:probe'))
+        for model, name in (
+            (User, 'users'), (Group, 'groups'), (Post, 'posts'),
+            (Follow, 'follows'), (Comment, 'comments'),
+        ):
+            with self.subTest(model=name):
+                self.assertEqual(model.objects.count(), VOLUMES[name])
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertTrue(FeedItem.objects.exists())
+        followers = sorted(User.objects.annotate(
+            followers=Count('following')
+        ).values_list('followers', flat=True), reverse=True)
+        average = VOLUMES['follows'] / VOLUMES['users']
+        self.assertGreater(followers[0], average * 3)
+
+    def test_seed_is_deterministic(self):
+        """Одно и то же зерно даёт одни и те же данные"""
+        first = self.seed()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertEqual(self.seed(), first)
@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=post
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        author_stats, reader_stats = self.stats(self.author), self.stats(
+            self.reader
+        )
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.subscriptions_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        follow.delete()
+        post.delete()
+        author_stats, reader_stats = self.stats(self.author), self.stats(
+            self.reader
+        )
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.subscriptions_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+
+    def test_recount_command_repairs_counters(self):
+        """recount_user_stats чинит расходящиеся и пропавшие счётчики"""
+        Post.objects.bulk_create(
+            [Post(text='Пост', author=self.author) for _ in range(3)]
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        self.stats(self.reader).delete()
+        call_command('recount_user_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 3)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.assertEqual(self.stats(self.reader).subscriptions_count, 1)
+
+    def test_profile_uses_counters(self):
+        """Профиль берёт счётчики из статистики, а не из COUNT(*)"""
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.client.get(f'/profile/{self.author.username}/')
+        self.assertContains(response, 'Всего постов: 1')
@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Page
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+from ..models import FeedItem, Follow, Group, GroupFollow, Post, User
+from ..streams import AUTHOR, MergedFeedPaginator, feed_page
+
+AUTHORS: int = 3
+POSTS_PER_AUTHOR: int = 4
+PER_PAGE: int = 3
+STREAM_DEPTH: int = 2
+
+
+@override_settings(
+    PULL_FEED_MIN_FOLLOWING=AUTHORS, FEED_STREAM_DEPTH=STREAM_DEPTH
+)
+class PullFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(AUTHORS)
+        ]
+        for number in range(POSTS_PER_AUTHOR):
+            for author in cls.authors:
+                Post.objects.create(text=f'Пост {number}', author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__following__user=self.reader
+        ).order_by('-pub_date', '-pk'))
+
+    def test_merged_pages_match_join_query(self):
+        """Слияние потоков листается так же, как прямой запрос"""
+        sources = [(AUTHOR, author.pk) for author in self.authors]
+        pages, cursor = [], None
+        while True:
+            paginator = MergedFeedPaginator(sources, PER_PAGE)
+            page = paginator.get_page(cursor)
+            pages.append(list(page))
+            cursor = paginator.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(sum(pages, []), self.expected())
+        cursor = paginator.previous_cursor
+        for expected in reversed(pages[:-1]):
+            paginator = MergedFeedPaginator(sources, PER_PAGE)
+            self.assertEqual(list(paginator.get_page(cursor)), expected)
+            cursor = paginator.previous_cursor
+
+    def test_group_and_author_streams_are_deduplicated(self):
+        """Пост автора из группы в подписках попадает в ленту один раз"""
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(
+            text='Пост группы', author=self.authors[0], group=group
+        )
+        GroupFollow.objects.create(user=self.reader, group=group)
+        page = feed_page(self.reader, self.factory.get('/'))
+        self.assertEqual(list(page), self.expected()[:len(page)])
+        self.assertEqual(list(page).count(post), 1)
+
+    def test_heavy_reader_gets_no_fan_out(self):
+        """Посты не раскладываются в ленту читателя за порогом подписок"""
+        Post.objects.create(text='Новый пост', author=self.authors[0])
+        self.assertFalse(FeedItem.objects.filter(user=self.reader).exists())
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(type(page_obj), Page)
+        self.assertEqual(list(page_obj), self.expected()[:len(page_obj)])
+
+    def test_new_post_reaches_cached_streams(self):
+        """Новый пост автора сразу виден в собранной ленте"""
+        request = self.factory.get('/')
+        feed_page(self.reader, request)
+        with commit_callbacks():
+            post = Post.objects.create(
+                text='Новый пост', author=self.authors[0]
+            )
+        self.assertEqual(feed_page(self.reader, request)[0], post)
+
+    def test_unfollow_below_threshold_rebuilds_feed(self):
+        """Отписка ниже порога возвращает материализованную ленту"""
+        Follow.objects.filter(author=self.authors[0]).delete()
+        self.assertEqual(
+            [item.post for item in FeedItem.objects.filter(user=self.reader)],
+            self.expected()
+        )
+
+    def test_bench_feed_leaves_database_untouched(self):
+        """Замер движков сверяет страницы, откатывает подписки и не
+        очищает кеш сайта"""
+        Follow.objects.filter(author=self.authors[0]).delete()
+        follows = Follow.objects.count()
+        cache.set('site:probe', True)
+        call_command(
+            'bench_feed', runs=1, warmup=0, page=2, username='reader',
+            stdout=StringIO()
+        )
+        self.assertEqual(Follow.objects.count(), follows)
+        self.assertTrue(cache.get('site:probe'))
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+from functools import partial
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.testing import commit_callbacks
+from ..cache import bump, get_versions, version_key
+from ..models import Post, User
+from ..signals import thumbnails_ready
+from ..thumbnails import ready_thumbnail, schedule_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = self.create_post('small.gif')
+
+    def create_post(self, name):
+        return Post.objects.create(
+            text='Пост',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name=name, content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюры нет, страница выводит заглушку, а не генерирует"""
+        for url in (f'/posts/{self.post.pk}/', '/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'bg-light')
+                self.assertNotContains(response, '<img class="card-img')
+        self.assertIsNone(ready_thumbnail(self.post.image, 'card'))
+        with commit_callbacks():
+            schedule_thumbnails(
+                self.post.image.name,
+                on_ready=partial(thumbnails_ready, self.post)
+            )
+        thumbnail = ready_thumbnail(self.post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        for url in (f'/posts/{self.post.pk}/', '/'):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), thumbnail.url)
+
+    def test_cached_card_skips_thumbnail_lookup(self):
+        """Карточка из кеша фрагментов не ищет миниатюру в KVStore"""
+        self.client.get('/')
+        bump('posts')
+        with mock.patch(
+            'posts.thumbnails.ready_thumbnail', return_value=None
+        ) as lookup:
+            self.client.get('/')
+        lookup.assert_not_called()
+
+    def test_backfill_resumes_from_checkpoint(self):
+        """backfill_thumbnails продолжает с места остановки"""
+        other = self.create_post('other.gif')
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'backfill.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'last_pk': self.post.pk}, file)
+        call_command(
+            'backfill_thumbnails', workers=0, checkpoint=checkpoint,
+            stdout=StringIO()
+        )
+        self.assertIsNone(ready_thumbnail(self.post.image, 'card'))
+        self.assertIsNotNone(ready_thumbnail(other.image, 'card'))
+        self.assertFalse(os.path.exists(checkpoint))
+        call_command(
+            'backfill_thumbnails', workers=0, checkpoint=checkpoint,
+            stdout=StringIO()
+        )
+        self.assertIsNotNone(ready_thumbnail(self.post.image, 'card'))
+
+    def test_backfill_bumps_feed_versions(self):
+        """backfill_thumbnails сбрасывает страницы с постами пачки"""
+        keys = [
+            version_key('posts'),
+            version_key('post', self.post.pk),
+            version_key('author', self.post.author.username),
+        ]
+        before, _ = get_versions(keys)
+        call_command(
+            'backfill_thumbnails', workers=0, restart=True,
+            checkpoint=os.path.join(TEMP_MEDIA_ROOT, 'backfill.json'),
+            stdout=StringIO()
+        )
+        after, _ = get_versions(keys)
+        for key, old, new in zip(keys, before, after):
+            with self.subTest(key=key):
+                self.assertNotEqual(old, new)
+
+    def test_image_metadata_saved_on_upload(self):
+        """Размеры и превью картинки сохраняются при загрузке"""
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+        self.assertRegex(self.post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertTrue(
+            self.post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+
+    def test_fill_image_metadata_command(self):
+        """fill_image_metadata заполняет данные картинок старых постов"""
+        Post.objects.update(
+            image_width=None, image_height=None,
+            image_color='', image_placeholder=''
+        )
+        call_command('fill_image_metadata', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+        self.assertTrue(self.post.image_placeholder)
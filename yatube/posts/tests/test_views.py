@@ -2,10 +2,16 @@ from http import HTTPStatus
 
 from django import forms
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Post, Group, User, Follow, Comment
+from core.middleware import PIN_COOKIE
+from core.testing import commit_callbacks
+from ..cache import _slot_key, bump, get_versions, version_key
+from ..following import following_ids, following_key
+from ..models import Post, Group, GroupFollow, User, Follow, Comment
 
 NUMBER_OF_POSTS: int = 1
 NEW_POSTS: int = 13
@@ -14,6 +20,8 @@ POSTS_ON_SECOND_PAGE: int = 3
 FIRST_PAGE: int = 1
 SECOND_PAGE: int = 2
 ZERO: int = 0
+COMMENTS_ON_FIRST_PAGE: int = 20
+COMMENTS_ON_SECOND_PAGE: int = 5
 
 
 class PostPagesTests(TestCase):
@@ -70,20 +78,157 @@ class PostPagesTests(TestCase):
     def test_index_cache(self):
         """Проверка кеша главной страницы"""
         response = self.authorized_client.get(self.index)
-        content_before_del_post = response.content
-        Post.objects.all().delete()
-        response_after_del_post = self.authorized_client.get(
-            self.index
-        )
-        content_after_del_post = response_after_del_post.content
-        self.assertEqual(content_before_del_post, content_after_del_post)
+        content_before_update = response.content
+        # Изменение в обход сигналов версию ленты не поднимает
+        Post.objects.update(text='Текст без сигналов')
+        response_after_update = self.authorized_client.get(self.index)
+        self.assertEqual(content_before_update, response_after_update.content)
         # Очищаем кеш и проверяем на изменение ответа
         cache.clear()
         response_after_clear_cache = self.authorized_client.get(
             self.index
         )
         content_after_clear_cache = response_after_clear_cache.content
-        self.assertNotEqual(content_after_del_post, content_after_clear_cache)
+        self.assertNotEqual(content_before_update, content_after_clear_cache)
+
+    def test_cache_invalidated_by_signals(self):
+        """Новые посты и комментарии сразу видны на закешированных
+        страницах"""
+        pages = [self.detail, self.index, self.group_path, self.profile]
+        # Первый ответ ставит cookie csrftoken, от которой зависит ключ
+        # страницы, поэтому каждая страница кешируется со второго захода.
+        for _ in range(2):
+            for page in pages:
+                self.authorized_client.get(page)
+        with commit_callbacks():
+            Post.objects.create(
+                text='Свежий пост', author=self.user, group=self.group
+            )
+            Comment.objects.create(
+                text='Свежий комментарий', author=self.user, post=self.post
+            )
+        self.assertContains(
+            self.authorized_client.get(self.detail), 'Свежий комментарий'
+        )
+        for page in pages[1:]:
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.authorized_client.get(page), 'Свежий пост'
+                )
+
+    def test_post_page_kept_on_unrelated_posts(self):
+        """Пост другого автора не сбрасывает страницу поста"""
+        other = User.objects.create_user(username='other')
+        for _ in range(2):
+            self.client.get(self.detail)
+        with commit_callbacks():
+            Post.objects.create(text='Чужой пост', author=other)
+        with self.assertNumQueries(0):
+            self.client.get(self.detail)
+        with commit_callbacks():
+            Post.objects.create(text='Ещё пост', author=self.user)
+        response = self.client.get(self.detail)
+        self.assertEqual(
+            response.context['post'].author.stats.posts_count, 2
+        )
+
+    def test_group_change_refreshes_cards(self):
+        """Правка и удаление группы сразу видны на главной и в профиле"""
+        pages = (self.index, self.profile)
+        for _ in range(2):
+            for page in pages:
+                self.client.get(page)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new_slug'
+        with commit_callbacks():
+            group.save()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), 'new_slug')
+        with commit_callbacks():
+            group.delete()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertNotContains(self.client.get(page), 'new_slug')
+
+    def test_conditional_get(self):
+        """Неизменившаяся страница отдаёт 304 без запросов к базе"""
+        for page in (self.index, self.group_path, self.profile, self.detail):
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        page, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                response = self.client.get(
+                    page, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+        with commit_callbacks():
+            Comment.objects.create(
+                text='Свежий комментарий', author=self.user, post=self.post
+            )
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_versions_bumped_after_commit(self):
+        """Версии лент поднимаются только после фиксации записи"""
+        keys = [version_key('posts')]
+        versions, _ = get_versions(keys)
+        with commit_callbacks():
+            Post.objects.create(text='Новый пост', author=self.user)
+            self.assertEqual(get_versions(keys)[0], versions)
+        self.assertNotEqual(get_versions(keys)[0], versions)
+
+    def hold_render_lock(self, page, view_name):
+        slot = _slot_key(RequestFactory().get(page), view_name)
+        cache.add(f'{slot}:lock', True, 60)
+        return f'{slot}:lock'
+
+    def test_stale_page_served_while_rendering(self):
+        """Пока страницу перерисовывает другой запрос, отдаётся старая копия"""
+        self.client.get(self.index)
+        Post.objects.create(text='Совсем новый пост', author=self.user)
+        bump('posts')
+        lock = self.hold_render_lock(self.index, 'index')
+        response = self.client.get(self.index)
+        self.assertNotContains(response, 'Совсем новый пост')
+        self.assertFalse(response.has_header('ETag'))
+        cache.delete(lock)
+        response = self.client.get(self.index)
+        self.assertContains(response, 'Совсем новый пост')
+        self.assertTrue(response.has_header('ETag'))
+
+    @override_settings(FEED_RENDER_LOCK_TIMEOUT=0.2)
+    def test_pinned_user_gets_fresh_page(self):
+        """Только что писавший не получает устаревшую копию"""
+        self.client.get(self.index)
+        Post.objects.create(text='Совсем новый пост', author=self.user)
+        bump('posts')
+        self.hold_render_lock(self.index, 'index')
+        self.client.cookies[PIN_COOKIE] = '1'
+        response = self.client.get(self.index)
+        self.assertContains(response, 'Совсем новый пост')
+
+    def test_article_fragment_cache(self):
+        """Карточка поста берётся из кеша, пока не изменится сам пост"""
+        self.authorized_client.get(self.index)
+        Post.objects.filter(pk=self.post.pk).update(text='Текст без сигналов')
+        # Сбрасываем кеш страницы, но не кеш фрагментов
+        bump('posts')
+        response = self.authorized_client.get(self.index)
+        self.assertNotContains(response, 'Текст без сигналов')
+        # Пересохранение двигает updated, а с ним и ключ фрагмента
+        with commit_callbacks():
+            Post.objects.get(pk=self.post.pk).save()
+        response = self.authorized_client.get(self.index)
+        self.assertContains(response, 'Текст без сигналов')
 
     def test_pages_uses_correct_template(self):
         """URL адрес использует свой шаблон"""
@@ -223,6 +368,55 @@ class PaginatorViewsTest(TestCase):
                         response.context['page_obj']), posts
                     )
 
+    def test_page_past_the_end_serves_last_page(self):
+        """Номер страницы за концом выборки отдаёт последнюю страницу"""
+        for page in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'HasNoName'}),
+        ):
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page, {'page': 9999})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                page_obj = response.context['page_obj']
+                self.assertEqual(page_obj.number, SECOND_PAGE)
+                self.assertEqual(len(page_obj), POSTS_ON_SECOND_PAGE)
+
+    def test_offset_pagination_skips_count(self):
+        """Постраничная навигация не считает COUNT(*) и не знает о
+        страницах дальше следующей"""
+        group_path = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                group_path, {'page': FIRST_PAGE}
+            )
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.has_next())
+        self.assertEqual(page_obj.paginator.num_pages, SECOND_PAGE)
+        self.assertContains(response, f'?page={SECOND_PAGE}')
+
+    def test_cursor_pagination(self):
+        """Курсорная пагинация проходит ленту вперёд и назад"""
+        cache.clear()
+        index = reverse('posts:index')
+        first_page = self.authorized_client.get(index).context['page_obj']
+        self.assertEqual(len(first_page), POSTS_ON_FIRST_PAGE)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.authorized_client.get(
+            index, {'cursor': first_page.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), POSTS_ON_SECOND_PAGE)
+        self.assertEqual(second_page.number, SECOND_PAGE)
+        self.assertFalse(second_page.has_next())
+        back_page = self.authorized_client.get(
+            index, {'cursor': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertEqual(back_page.number, FIRST_PAGE)
+
 
 class ViewFollowTests(TestCase):
     @classmethod
@@ -305,6 +499,60 @@ class ViewFollowTests(TestCase):
         self.assertEqual(response_follower.context['post'].group, None)
         self.assertNotIn(post, response_authorized_client.context['page_obj'])
 
+    def test_following_set_reset_on_follow_and_unfollow(self):
+        """Подписка и отписка сбрасывают закешированное множество авторов"""
+        self.assertEqual(following_ids(self.follower_user), frozenset())
+        with commit_callbacks():
+            self.follower_client.get(self.profile_follow)
+        self.assertIn(
+            self.following_user.pk, following_ids(self.follower_user)
+        )
+        with self.assertNumQueries(ZERO):
+            following_ids(self.follower_user)
+        with commit_callbacks():
+            self.follower_client.get(reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.following_user}
+            ))
+        self.assertNotIn(
+            self.following_user.pk, following_ids(self.follower_user)
+        )
+
+    def test_follow_writes_regardless_of_cached_set(self):
+        """Подписка пишется в базу, даже если кеш считает её существующей"""
+        cache.set(
+            following_key(self.follower_user.pk),
+            frozenset({self.following_user.pk}),
+            None
+        )
+        self.follower_client.get(self.profile_follow)
+        self.assertTrue(Follow.objects.filter(
+            user=self.follower_user, author=self.following_user
+        ).exists())
+
+    def test_index_follow_buttons_without_follow_queries(self):
+        """Кнопки подписки на главной не запрашивают подписки из базы"""
+        Post.objects.create(text='Test post', author=self.following_user)
+        unfollow = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.following_user}
+        )
+        index = reverse('posts:index')
+        response = self.follower_client.get(index)
+        self.assertContains(response, self.profile_follow)
+        with commit_callbacks():
+            self.follower_client.get(self.profile_follow)
+        self.follower_client.get(index)
+        # Страница отрисовывается заново, множество подписок уже в кеше
+        bump('posts')
+        with CaptureQueriesContext(connection) as context:
+            response = self.follower_client.get(index)
+        self.assertContains(response, unfollow)
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in context.captured_queries
+        ))
+
     def test_guest_client_cant_subscribe(self):
         """Неавторизованный клиент не может подписаться"""
         response = self.guest_client.get(
@@ -312,3 +560,106 @@ class ViewFollowTests(TestCase):
         )
         self.assertEqual(response.status_code, HTTPStatus.FOUND)
         self.assertEqual(Follow.objects.count(), ZERO)
+
+
+class ViewGroupFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.group_list = reverse('posts:group_list', args=[cls.group.slug])
+        cls.group_follow = reverse(
+            'posts:group_follow', args=[cls.group.slug]
+        )
+        cls.group_unfollow = reverse(
+            'posts:group_unfollow', args=[cls.group.slug]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_authorized_client_can_follow_and_unfollow_group(self):
+        """Пользователь подписывается на группу и отписывается от неё"""
+        with commit_callbacks():
+            response = self.authorized_client.get(self.group_follow)
+        self.assertRedirects(response, self.group_list)
+        self.assertTrue(GroupFollow.objects.filter(
+            user=self.user, group=self.group
+        ).exists())
+        self.assertContains(
+            self.authorized_client.get(self.group_list), self.group_unfollow
+        )
+        with commit_callbacks():
+            self.authorized_client.get(self.group_unfollow)
+        self.assertFalse(GroupFollow.objects.exists())
+        self.assertContains(
+            self.authorized_client.get(self.group_list), self.group_follow
+        )
+
+    def test_group_posts_in_follow_index(self):
+        """Посты группы из подписок появляются в ленте подписок"""
+        self.authorized_client.get(self.group_follow)
+        post = Post.objects.create(
+            text='Пост группы',
+            author=User.objects.create_user(username='author'),
+            group=self.group
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_guest_client_cant_follow_group(self):
+        """Неавторизованный клиент не может подписаться на группу"""
+        response = Client().get(self.group_follow)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertFalse(GroupFollow.objects.exists())
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.detail = reverse('posts:post_detail', kwargs={'pk': cls.post.pk})
+        cls.more = reverse('posts:post_comments', kwargs={'pk': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            commentator = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(
+                text=f'Комментарий {i}', author=commentator, post=self.post
+            )
+
+    def test_comments_do_not_query_authors_one_by_one(self):
+        """Число запросов страницы поста не зависит от числа комментариев"""
+        self.add_comments(1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.detail)
+        cache.clear()
+        self.add_comments(COMMENTS_ON_FIRST_PAGE)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.detail)
+        self.assertEqual(len(few), len(many))
+
+    def test_comments_load_more(self):
+        """Комментарии отдаются порциями и догружаются по курсору"""
+        self.add_comments(COMMENTS_ON_FIRST_PAGE + COMMENTS_ON_SECOND_PAGE)
+        comments = self.client.get(self.detail).context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_FIRST_PAGE)
+        response = self.client.get(
+            self.more,
+            {'cursor': comments.paginator.next_cursor, 'format': 'json'}
+        )
+        data = response.json()
+        self.assertEqual(len(data['comments']), COMMENTS_ON_SECOND_PAGE)
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['comments'][-1]['text'], 'Комментарий 0')
@@ -0,0 +1,195 @@
+import base64
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import deserialize, serialize
+from sorl.thumbnail.images import ImageFile, serialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+
+logger = logging.getLogger(__name__)
+
+PENDING_TIMEOUT: int = 60
+PLACEHOLDER_SIZE: int = 16
+EMPTY_IMAGE_METADATA = {
+    'image_width': None,
+    'image_height': None,
+    'image_color': '',
+    'image_placeholder': '',
+}
+
+_executor = None
+
+
+def image_metadata(file):
+    """Размеры, средний цвет и крошечное превью картинки для заглушки."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            image = image.convert('RGB')
+            red, green, blue = image.resize((1, 1), Image.BOX).getpixel(
+                (0, 0)
+            )
+            image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=40)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning('Не удалось прочитать картинку %s', file.name)
+        return dict(EMPTY_IMAGE_METADATA)
+    finally:
+        file.seek(0)
+    placeholder = base64.b64encode(buffer.getvalue()).decode()
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'image_placeholder': f'data:image/jpeg;base64,{placeholder}',
+    }
+
+
+def _thumbnail(source, alias):
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return geometry, options, ImageFile(name, default.storage)
+
+
+def thumbnail_file(image, alias):
+    """ImageFile миниатюры под тем же именем, которое выберет sorl."""
+    return _thumbnail(ImageFile(image), alias)[2]
+
+
+def ready_thumbnail(image, alias):
+    """Готовая миниатюра из KVStore или None; сам файл не открывается."""
+    return default.kvstore.get(thumbnail_file(image, alias))
+
+
+def generate_thumbnails(name):
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        get_thumbnail(name, geometry, **options)
+    return name
+
+
+def render_thumbnails(name):
+    """Готовит файлы миниатюр, не трогая KVStore.
+
+    Возвращает записи KVStore для исходника и миниатюр, чтобы их можно было
+    записать пачкой, и ключ со списком миниатюр исходника.
+    """
+    source = ImageFile(name)
+    source_image = default.engine.get_image(source)
+    thumbnails = []
+    try:
+        source.set_size(default.engine.get_image_size(source_image))
+        image_info = default.engine.get_image_info(source_image)
+        for alias in settings.POST_THUMBNAILS:
+            geometry, options, thumbnail = _thumbnail(source, alias)
+            options['image_info'] = image_info
+            default.backend._create_thumbnail(
+                source_image, geometry, options, thumbnail
+            )
+            thumbnails.append(thumbnail)
+    finally:
+        default.engine.cleanup(source_image)
+    entries = {
+        add_prefix(image.key): serialize_image_file(image)
+        for image in [source, *thumbnails]
+    }
+    return entries, add_prefix(source.key, 'thumbnails'), [
+        thumbnail.key for thumbnail in thumbnails
+    ]
+
+
+def store_entries(entries, thumbnail_lists):
+    """Пишет записи KVStore пачкой: в базу и в кеш sorl.
+
+    thumbnail_lists — ключи списков миниатюр исходников; новые ключи
+    дописываются к тем, что уже лежат в хранилище.
+    """
+    from sorl.thumbnail.models import KVStore as KVStoreModel
+
+    entries = dict(entries)
+    stored = KVStoreModel.objects.in_bulk(list(thumbnail_lists))
+    for key, thumbnail_keys in thumbnail_lists.items():
+        if key in stored:
+            thumbnail_keys = set(thumbnail_keys).union(
+                deserialize(stored[key].value)
+            )
+        entries[key] = serialize(sorted(thumbnail_keys))
+    with transaction.atomic():
+        KVStoreModel.objects.filter(key__in=list(entries)).delete()
+        KVStoreModel.objects.bulk_create(
+            KVStoreModel(key=key, value=value)
+            for key, value in entries.items()
+        )
+    default.kvstore.cache.set_many(
+        entries, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+    )
+
+
+def _init_worker():
+    # Модуль подгружается в дочернем процессе до настройки Django, поэтому
+    # модели здесь импортируются только внутри функций.
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _complete(name, error, on_ready):
+    cache.delete(f'thumbnail_pending:{name}')
+    if error is not None:
+        logger.error(
+            'Не удалось подготовить миниатюры для %s', name, exc_info=error
+        )
+    elif on_ready is not None:
+        on_ready()
+
+
+def schedule_thumbnails(name, on_ready=None):
+    """Ставит генерацию миниатюр картинки в пул процессов.
+
+    Повторные вызовы, пока генерация не закончилась, ничего не делают.
+    on_ready вызывается в этом процессе, когда миниатюры готовы.
+    """
+    if not cache.add(f'thumbnail_pending:{name}', True, PENDING_TIMEOUT):
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        try:
+            generate_thumbnails(name)
+        except Exception as error:
+            _complete(name, error, on_ready)
+        else:
+            _complete(name, None, on_ready)
+        return
+    future = _get_executor().submit(generate_thumbnails, name)
+    future.add_done_callback(
+        lambda done: _complete(name, done.exception(), on_ready)
+    )
@@ -1,10 +1,168 @@
-from django.core.paginator import Paginator
+import base64
+import json
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 NUMBER_OF_POST = 10
+NUMBER_OF_COMMENTS = 20
+POST_KEYSET = ('pub_date', 'pk')
+FEED_KEYSET = ('pub_date', 'post_id')
+COMMENT_KEYSET = ('created', 'pk')
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+def encode_cursor(number, direction, values):
+    payload = json.dumps({
+        'n': number,
+        'd': direction,
+        'k': [values[0].isoformat(), values[1]],
+    })
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для пустого или испорченного возвращает None."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )
+        number, direction = int(payload['n']), payload['d']
+        moment, pk = parse_datetime(payload['k'][0]), int(payload['k'][1])
+    except (ValueError, TypeError, KeyError, IndexError):
+        return None
+    if moment is None or direction not in (NEXT, PREVIOUS) or number < 1:
+        return None
+    return number, direction, (moment, pk)
+
+
+class CountlessPaginator(Paginator):
+    """OFFSET-пагинация без COUNT(*).
+
+    Выбирает на одну запись больше страницы, чтобы узнать о следующей;
+    num_pages знает только страницы до следующей за текущей.
+    """
+    countless = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page)
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет записей')
+        self._num_pages = number + 1 if len(rows) > self.per_page else number
+        return self._get_page(rows[:self.per_page], number, self)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (дата, id) вместо COUNT(*) и OFFSET.
+
+    Номер страницы и направление зашиты в непрозрачный курсор, поэтому
+    get_page() возвращает обычный Page, пригодный для тех же шаблонов,
+    а любая страница стоит столько же, сколько первая.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, key=POST_KEYSET):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def _values(self, obj):
+        return tuple(getattr(obj, name) for name in self.key)
+
+    def _rows(self, direction, values, limit):
+        """Первые limit записей за values: в порядке обхода направления.
+
+        Без values — начало выборки; для NEXT порядок убывающий, для
+        PREVIOUS — возрастающий.
+        """
+        field, tiebreak = self.key
+        descending = (f'-{field}', f'-{tiebreak}')
+        if values is None:
+            queryset = self.object_list.order_by(*descending)
+        else:
+            moment, pk = values
+            if direction == NEXT:
+                queryset = self.object_list.filter(
+                    Q(**{f'{field}__lt': moment})
+                    | Q(**{field: moment, f'{tiebreak}__lt': pk})
+                ).order_by(*descending)
+            else:
+                queryset = self.object_list.filter(
+                    Q(**{f'{field}__gt': moment})
+                    | Q(**{field: moment, f'{tiebreak}__gt': pk})
+                ).order_by(field, tiebreak)
+        return list(queryset[:limit])
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor)
+        if position is None:
+            number, direction, values = 1, NEXT, None
+        else:
+            number, direction, values = position
+        rows = self._rows(direction, values, self.per_page + 1)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = position is not None, more
+        number = max(number, 2) if has_previous else 1
+        if rows and has_next:
+            self.next_cursor = encode_cursor(
+                number + 1, NEXT, self._values(rows[-1])
+            )
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(
+                number - 1, PREVIOUS, self._values(rows[0])
+            )
+        self._num_pages = number + 1 if self.next_cursor else number
+        return self._get_page(rows, number, self)
+
 
+def get_paginator_obj(queryset, request, keyset=None,
+                      per_page=NUMBER_OF_POST):
+    """Страница выборки; с keyset вид переходит на курсорную пагинацию.
 
-def get_paginator_obj(queryset, request):
-    paginator = Paginator(queryset, NUMBER_OF_POST)
+    Старые ссылки вида ?page=N продолжают обслуживаться через OFFSET.
+    """
+    if keyset and ('cursor' in request.GET or 'page' not in request.GET):
+        paginator = CursorPaginator(queryset, per_page, key=keyset)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = CountlessPaginator(queryset, per_page)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    try:
+        return paginator.get_page(page_number)
+    except EmptyPage:
+        # Номер за концом выборки: отдаётся последняя страница, как у
+        # обычного Paginator; COUNT(*) нужен только в этом случае.
+        return paginator.page(max((paginator.count - 1) // per_page + 1, 1))
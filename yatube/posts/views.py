@@ -1,24 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 
+from core.transactions import immediate_atomic
+from .cache import cache_feed
+from .export import CONTENT_TYPES, ExportError, export_rows, render_lines
+from .feed import pulls
+from .following import following_ids
 from .forms import PostForm, CommentForm
-from .models import Post, Group, Comment, Follow, User
-from .utils import get_paginator_obj
+from .models import Post, Group, GroupFollow, Follow, FeedItem, User
+from .search import search_posts
+from .streams import feed_page
+from .utils import (
+    get_paginator_obj,
+    COMMENT_KEYSET,
+    FEED_KEYSET,
+    NUMBER_OF_COMMENTS,
+    NUMBER_OF_POST,
+    POST_KEYSET,
+)
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_feed(('posts', None))
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_paginator_obj(post_list, request)
+    page_obj = get_paginator_obj(post_list, request, keyset=POST_KEYSET)
     return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
+@cache_feed(('group', 'slug'))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('group', 'author')
-    page_obj = get_paginator_obj(post_list, request)
+    page_obj = get_paginator_obj(post_list, request, keyset=POST_KEYSET)
     return render(
         request,
         'posts/group_list.html',
@@ -26,16 +46,16 @@ def group_posts(request, slug):
     )
 
 
+@cache_feed(('author', 'username'), ('titles', None))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     user_posts = author.posts.select_related('author', 'group')
-    page_obj = get_paginator_obj(user_posts, request)
+    page_obj = get_paginator_obj(user_posts, request, keyset=POST_KEYSET)
     following = (
-        request.user.is_authenticated
-        and request.user != author
-        and request.user.follower.filter(
-            author=author
-        ).exists()
+        request.user != author
+        and author.pk in following_ids(request.user)
     )
     return render(
         request,
@@ -44,9 +64,34 @@ def profile(request, username):
     )
 
 
+def _post_author_id(pk):
+    """id автора поста; автор у поста не меняется, и id кешируется без
+    срока, чтобы проверка свежести страницы обходилась без базы."""
+    key = f'post_author:{pk}'
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=pk).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(key, author_id, None)
+    return author_id or ''
+
+
+# Счётчик постов автора зависит от версии автора, имена пользователей и
+# названия групп — от общей версии titles, которую поднимают только их
+# правки, а не каждый новый пост.
+@cache_feed(('post', 'pk'), ('user', _post_author_id), ('titles', None))
 def post_detail(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    comments = Comment.objects.filter(post=post)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=pk
+    )
+    comments = get_paginator_obj(
+        post.comments.select_related('author'),
+        request,
+        keyset=COMMENT_KEYSET,
+        per_page=NUMBER_OF_COMMENTS
+    )
     form = CommentForm(request.POST or None)
     return render(
         request,
@@ -55,6 +100,73 @@ def post_detail(request, pk):
     )
 
 
+@cache_feed(('post', 'pk'), ('titles', None))
+def post_comments(request, pk):
+    post = get_object_or_404(Post, pk=pk)
+    comments = get_paginator_obj(
+        post.comments.select_related('author'),
+        request,
+        keyset=COMMENT_KEYSET,
+        per_page=NUMBER_OF_COMMENTS
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.paginator.next_cursor,
+        })
+    return render(
+        request,
+        'posts/includes/comments.html',
+        {'post': post, 'comments': comments}
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search_posts(
+        query, request.GET.get('cursor'), limit=NUMBER_OF_POST
+    )
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    })
+
+
+@staff_member_required
+def export_data(request, kind):
+    """Потоковая выгрузка для персонала.
+
+    За один запрос отдаётся не больше EXPORT_WEB_LIMIT строк, чтобы не
+    занимать процесс надолго; следующую часть запрашивают с after=<id>
+    последней строки, а полные выгрузки делает команда export_data.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    try:
+        lines = render_lines(kind, export_rows(
+            kind,
+            author=request.GET.get('author'),
+            group=request.GET.get('group'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            after=request.GET.get('after'),
+            limit=settings.EXPORT_WEB_LIMIT,
+        ), fmt)
+    except ExportError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
 @login_required
 def post_create(request):
     user = get_object_or_404(User, id=request.user.pk)
@@ -65,7 +177,8 @@ def post_create(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        with immediate_atomic():
+            new_post.save()
         return redirect(reverse('posts:profile', args=[user]))
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -81,7 +194,8 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        with immediate_atomic():
+            form.save()
         return redirect(reverse('posts:post_detail', args=[post_id]))
     return render(
         request,
@@ -98,20 +212,28 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with immediate_atomic():
+            comment.save()
     return redirect('posts:post_detail', pk=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator_obj(posts, request)
+    if pulls(request.user.pk):
+        page_obj = feed_page(request.user, request)
+        return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    feed = FeedItem.objects.filter(user=request.user).select_related(
+        'post__author', 'post__group'
+    )
+    page_obj = get_paginator_obj(feed, request, keyset=FEED_KEYSET)
+    page_obj.object_list = [item.post for item in page_obj]
     return render(request, 'posts/follow.html', {'page_obj': page_obj})
 
 
 @login_required
+@immediate_atomic
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
+    author = get_object_or_404(User, username=username)
     if author != request.user:
         Follow.objects.get_or_create(
             user=request.user,
@@ -121,6 +243,22 @@ def profile_follow(request, username):
 
 
 @login_required
+@immediate_atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(user=request.user, author__username=username).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+@immediate_atomic
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@immediate_atomic
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug)
@@ -42,7 +42,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
@@ -51,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,16 +59,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,6 +81,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.following.following',
             ],
         },
     },
@@ -89,9 +94,40 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Копия для чтения; обновляет её manage.py refresh_replica
+    'replica': {
+        'ENGINE': 'core.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'PRAGMAS': {
+            'query_only': 1,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'temp_store': 'MEMORY',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Базы, с которых читают безопасные запросы (core.replicas)
+DATABASE_REPLICAS = ['replica']
+
+# Реплика со снимком старше стольких секунд не используется; столько же
+# живёт cookie, по которому писавший читает свои правки из основной базы
+REPLICA_MAX_LAG = 60
+
+# PRAGMA для каждого нового соединения с SQLite (core.sqlite3)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 # Password validation
@@ -148,11 +184,57 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Один кеш на все процессы: версии лент и страницы видны каждому воркеру
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backend.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+            'MAX_SIZE': 512 * 1024 * 1024,
+        },
     }
 }
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Тесты работают с кешем во временном каталоге, а не с общим файлом
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Глубина материализованной ленты подписок (posts.FeedItem)
+FOLLOW_FEED_DEPTH = 1000
+
+# С какого числа подписок на авторов и группы лента собирается при чтении
+# слиянием их потоков (posts.streams), а не раскладывается по FeedItem, и
+# сколько последних постов автора или группы держать в закешированном потоке
+PULL_FEED_MIN_FOLLOWING = 200
+FEED_STREAM_DEPTH = 50
+
+# Как часто (раз в сколько постов) подрезать ленты подписчиков до глубины
+FOLLOW_FEED_TRIM_EVERY = 50
+
+# Сколько живут закешированные страницы лент; сбрасываются они по версиям
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+
+# Сколько ещё после этого отдавать устаревшую страницу, пока её перерисовывает
+# один запрос; сколько держать блокировку перерисовки и как часто проверять,
+# готова ли страница, если прежней копии нет
+FEED_STALE_TIMEOUT = 60 * 60
+FEED_RENDER_LOCK_TIMEOUT = 10
+FEED_RENDER_POLL_INTERVAL = 0.05
+
+# Миниатюры картинок постов, которые готовятся заранее, вне запроса
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Сколько процессов готовят миниатюры; 0 — готовить сразу после коммита
+THUMBNAIL_WORKERS = 2
+
+# Сколько строк отдаёт веб-выгрузка за один запрос
+EXPORT_WEB_LIMIT = 100_000
+
+# Токен, с которым сборщик метрик читает /metrics/ (заголовок
+# Authorization: Bearer <токен>); пока он пуст, метрики видит только персонал
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')